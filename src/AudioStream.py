@@ -0,0 +1,97 @@
+import asyncio
+import time
+import traceback
+
+import websockets
+
+from Protocol import STREAM_START, STREAM_END, PARTIAL, RESULT, BUSY, encodeMessage
+
+
+class AudioStream:
+    """
+    Incremental speech ingestion for one connection. Streamed PCM chunks are
+    fed into the connection's recognizer as they arrive, partial transcripts
+    are pushed back, and every detected utterance goes straight into
+    autocorrect while the rest of the audio keeps streaming in.
+    Utterances the admission controller turns away are answered with BUSY.
+    Chunks arrive in the connection's negotiated format and are converted
+    to 16 kHz mono by decoder.
+    """
+
+    def __init__(self, websocket, pipeline, session, file, admission, decoder):
+        self.websocket = websocket
+        self.pipeline = pipeline
+        self.session = session
+        self.file = file
+        self.admission = admission
+        self.decoder = decoder
+        self.active = False
+        self.lastPartial = ''
+        self.commandTasks = set()
+
+    async def handleControl(self, control):
+        """Handle a stream_start or stream_end control message"""
+        if control['type'] == STREAM_START:
+            self.active = True
+            self.lastPartial = ''
+            self.decoder.reset()
+            self.file.writeToFile("Audio stream started by CLIENT")
+        elif control['type'] == STREAM_END:
+            if self.active:
+                text = await self.pipeline.finishStream(self.session)
+                self.active = False
+                if text:
+                    self._dispatch(text, time.perf_counter())
+            # Let the client know every utterance of the stream has been answered
+            if self.commandTasks:
+                await asyncio.gather(*self.commandTasks, return_exceptions=True)
+            await self.websocket.send(encodeMessage(STREAM_END))
+            self.file.writeToFile("Audio stream ended by CLIENT")
+
+    async def feed(self, chunk):
+        """Feed one audio chunk and push back partial or final transcripts"""
+        chunk = self.decoder.decodeChunk(chunk)
+        if not chunk:
+            return
+        finalTexts, partial = await self.pipeline.acceptAudioChunk(chunk, self.session)
+        if finalTexts:
+            self.lastPartial = ''
+            speechEndedAt = time.perf_counter()
+            for text in finalTexts:
+                if text:
+                    self._dispatch(text, speechEndedAt)
+        if partial != self.lastPartial:
+            self.lastPartial = partial
+            await self.websocket.send(encodeMessage(PARTIAL, text=partial))
+
+    def _dispatch(self, text, speechEndedAt):
+        """Start processing a finished utterance without blocking audio ingestion"""
+        loop = asyncio.get_running_loop()
+        if not self.admission.tryAdmit(self.websocket):
+            task = loop.create_task(self._send(encodeMessage(BUSY, text=text)))
+        else:
+            task = loop.create_task(self._runCommand(text, speechEndedAt))
+            task.add_done_callback(lambda _: self.admission.release(self.websocket))
+        self.commandTasks.add(task)
+        task.add_done_callback(self.commandTasks.discard)
+
+    async def _runCommand(self, text, speechEndedAt):
+        try:
+            requestId = self.pipeline.newRequestId()
+            result = await self.pipeline.processTranscript(text, requestId)
+            timeToCommandMs = (time.perf_counter() - speechEndedAt) * 1000
+            self.file.writeToFile(f"Time to command from end of speech: {timeToCommandMs:.1f} ms", requestId,
+                                  timeToCommandMs=timeToCommandMs)
+            await self.websocket.send(encodeMessage(RESULT, text=text, result=result, timeToCommandMs=timeToCommandMs))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception:
+            self.admission.recordFailure()
+            self.file.writeToFile(traceback.format_exc())
+            traceback.print_exc()
+
+    async def _send(self, message):
+        try:
+            await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
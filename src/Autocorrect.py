@@ -1,30 +1,81 @@
 from CommandRegistry import CommandRegistry
 from Utilities.ModelOptimizer import ModelOptimizer
 from Utilities.ApplicationRegistry import ApplicationRegistry
+from Utilities.IntentMatcher import IntentMatcher
+from Utilities.IntentClassifier import IntentClassifier
+from Utilities.CorrectionCache import CorrectionCache
+from Utilities.BatchScheduler import BatchScheduler
+from Utilities.LatencyTracker import LatencyTracker
 
 import os
 
 class Autocorrect:
     #responsible for taking the interpreted speech and autocorrecting it into
 
+    NO_MATCH = 'NO_MATCH'
+    # Returned when the model names an application that isn't installed
+    VALIDATION_ERROR = {"command": "ERROR validating open command"}
+    # Appended after the user input in constrained mode, matching the prompt's examples
+    ANSWER_ANCHOR = ' → Output: "'
+    # "llm" generates every correction, "classifier" answers confident
+    # transcripts with the TF-IDF intent classifier and asks the LLM otherwise
+    BACKENDS = ('llm', 'classifier')
 
-    def __init__(self, commandRegistry=None):
-        self.appRegistry = ApplicationRegistry()
+    def __init__(self, commandRegistry=None, quantization=None, loadModel=True, backend='llm', appRegistry=None):
+        self.appRegistry = appRegistry or ApplicationRegistry()
         if commandRegistry:
             self.commandRegistry = commandRegistry
         else:
             self.commandRegistry = CommandRegistry()
+
+        # Minimum ApplicationIndex score for a fuzzy application name match
+        self.appMatchScore = 0.6
+        # Only the applications closest to the transcript are listed in the
+        # prompt, so its length doesn't grow with the number of installed apps
+        self.promptAppCount = 8
+        self.promptAppScore = 0.2
+
+        # Exact and unambiguous transcripts are resolved without the LLM
+        self.intentMatcher = IntentMatcher(self.commandRegistry, self.appRegistry)
+        self.intentClassifier = None
+        self.setBackend(backend)
         
+        # Remembers LLM corrections across requests and restarts
+        cachePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "correction_cache.json")
+        self.correctionCache = CorrectionCache(cachePath)
+
+        # Restrict the LLM to valid command strings, decoded greedily
+        self.constrainedDecoding = True
+
+        # Rolling per-stage latencies, shared with the model and the command pipeline
+        self.latencyTracker = LatencyTracker()
+
         # Initialize optimized LLM for autocorrect
-        self.modelOptimizer = ModelOptimizer()
-        self._loadModel()
+        self.modelOptimizer = ModelOptimizer(quantization=quantization, latencyTracker=self.latencyTracker)
+        self.batchScheduler = None
+        if loadModel:
+            self.loadModel()
         self.prompt = self.setupPrompt()
+        self.appRegistry.addListener(self.onApplicationsChanged)
 
-    def _loadModel(self):
+    def loadModel(self):
         """Load an optimized small LLM for autocorrect functionality"""
         success = self.modelOptimizer.loadOptimizedModel()
         if not success:
             print("Falling back to rule-based autocorrect")
+        return success
+
+    def setBackend(self, backend):
+        """Choose how transcripts the fast path can't resolve are corrected"""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown correction backend: {backend}")
+        if backend == 'classifier' and self.intentClassifier is None:
+            self.intentClassifier = IntentClassifier(self.commandRegistry, self.appRegistry, self.NO_MATCH)
+        self.backend = backend
+
+    def enableBatching(self, windowMs=10, maxBatchSize=8):
+        """Batch concurrent LLM corrections arriving within windowMs into one generate call"""
+        self.batchScheduler = BatchScheduler(self.modelOptimizer, windowMs, maxBatchSize)
 
     def setupPrompt(self):
         try:
@@ -33,49 +84,133 @@ class Autocorrect:
         except FileNotFoundError:
             print("AutocorrectPrompt.txt not found, using fallback")
             return ""
-            
-        apps = ""
-        for i in range(2, len(self.appRegistry.apps)):
-            apps += self.appRegistry.apps[i][0] + '|'
 
-        promptTemplate = promptTemplate.replace("{detected_apps}", apps)
+        self.modelOptimizer.setAllowedOutputs(self._validOutputs(), anchor=self.ANSWER_ANCHOR[-1])
+
+        self.modelOptimizer.setPromptPrefix(self.promptPrefix(promptTemplate))
         return promptTemplate
 
+    @staticmethod
+    def promptPrefix(promptTemplate):
+        """
+        Everything up to the line holding the per request candidate apps is
+        identical for every request, so the model keeps its KV cache.
+        Splitting on a line break keeps the separately tokenized suffix
+        close to the joint tokenization.
+        """
+        staticPart = promptTemplate.split("{detected_apps}")[0]
+        return staticPart[:staticPart.rfind('\n') + 1]
+
+    def buildPrompt(self, command):
+        """Fill the prompt with the command and the applications most similar to it"""
+        return self.prompt.replace("{detected_apps}", self._candidateApps(command)).replace("{user_input}", command)
+
+    def _candidateApps(self, command):
+        """Names of the top promptAppCount applications for the transcript, without its open verb"""
+        words = command.split()
+        if words and words[0].lower() in self.commandRegistry.synonyms['open <application_name>']:
+            words = words[1:]
+        candidates = self.appRegistry.index.search(' '.join(words), limit=self.promptAppCount, minScore=self.promptAppScore)
+        if not candidates:
+            return "none"
+        return '|'.join(app[0] for _, app in candidates)
+
+    def _validOutputs(self):
+        """Every answer constrained decoding may produce"""
+        outputs = [cmd for cmd in self.commandRegistry.getAvailableCommands() if '<application_name>' not in cmd]
+        outputs += ['open ' + app[0] for app in self.appRegistry.apps]
+        outputs.append(self.NO_MATCH)
+        return outputs
+
+    def onApplicationsChanged(self, added, removed):
+        """Refresh the valid outputs and drop stale corrections when the app list changes"""
+        self.prompt = self.setupPrompt()
+        self.correctionCache.retainVersion(self.appRegistry.version)
+
     def correctCommand(self, command):
         print('given command: ', command)
-        promptWithCmd = self.prompt.replace("{user_input}", command)
-        if self.modelOptimizer.model is not None:
-            return self._llmCorrect(promptWithCmd, command)
-        else:
+        with self.latencyTracker.span("autocorrect.fastPath"):
+            fastMatch = self.intentMatcher.match(command)
+        if fastMatch is not None:
+            return fastMatch
+        if self.backend == 'classifier':
+            with self.latencyTracker.span("autocorrect.classifier"):
+                classified = self.intentClassifier.predict(command)
+            if classified is not None:
+                return classified
+        # Switches over to the LLM as soon as the loader publishes the model
+        if not self.modelOptimizer.isModelLoaded():
             return self._fallbackCorrect(command)
+
+        version = self.appRegistry.version
+        cached = self.correctionCache.get(command, version)
+        if cached is not None:
+            return cached
+        with self.latencyTracker.span("autocorrect.promptBuild"):
+            promptWithCmd = self.buildPrompt(command)
+            if self.constrainedDecoding:
+                promptWithCmd += self.ANSWER_ANCHOR
+        correctedCommand, validated = self._llmCorrect(promptWithCmd, command)
+        # Fallbacks and failed validations are retried next time instead of cached
+        if validated:
+            self.correctionCache.put(command, version, correctedCommand)
+        return correctedCommand
     
     def _llmCorrect(self, prompt, originalCommand):
-        """Use optimized LLM to correct the command"""
+        """
+        Use optimized LLM to correct the command, returns the command and
+        whether it came from a successful generation that passed validation
+        """
         print(prompt)
         try:
-            response = self.modelOptimizer.generateOptimized(
+            generate = self.modelOptimizer.generateOptimized
+            if self.batchScheduler is not None:
+                generate = self.batchScheduler.generate
+            response = generate(
                 prompt, 
                 maxTokens=50, 
-                temperature=0.1
+                temperature=0.1,
+                constrained=self.constrainedDecoding
             )
             
             if response is None:
-                return self._fallbackCorrect(originalCommand)
+                return self._fallbackCorrect(originalCommand), False
             print('llm response:')
             print(response)
             # Extract the corrected command from the response
-            correctedCommand = self._extractCommandFromResponse(response, originalCommand)
+            with self.latencyTracker.span("autocorrect.extract"):
+                if self.constrainedDecoding:
+                    correctedCommand = self._parseConstrainedResponse(response, originalCommand)
+                else:
+                    correctedCommand = self._extractCommandFromResponse(response, originalCommand)
             print('corrected command:')
             print(correctedCommand)
-            return correctedCommand
+            return correctedCommand, correctedCommand != self.VALIDATION_ERROR
             
         except Exception as e:
             print(f"LLM correction failed: {e}")
-            return self._fallbackCorrect(originalCommand)
+            return self._fallbackCorrect(originalCommand), False
     
+    def _parseConstrainedResponse(self, response, originalCommand):
+        """Turn an exact constrained-decoding answer into a command dict"""
+        if response == self.NO_MATCH or not response:
+            return {"command": originalCommand}
+        if response.startswith('open '):
+            result = self._findAppInCommand(response[5:])
+            if result:
+                return result
+            return dict(self.VALIDATION_ERROR)
+        return {"command": response}
+
     def _extractCommandFromResponse(self, response, originalCommand):
         """Extract the corrected command from LLM response"""
         availableCommands = self.commandRegistry.getAvailableCommands()
+
+        # Free-form answers name the application directly
+        if response.lower().startswith('open '):
+            result = self._findAppInCommand(response[5:])
+            if result:
+                return result
         
         # Check if any available command appears in the response
         for cmd in availableCommands:
@@ -91,21 +226,20 @@ class Autocorrect:
     
     def _findAppInCommand(self, searchText, debug=False):
         """Find matching application in the given text and return command dict"""
-        searchTextLower = searchText.lower()
-        for app in self.appRegistry.apps:
-            appName = app[0].lower()
+        candidates = self.appRegistry.index.search(searchText)
+        if debug:
+            print('candidates ', candidates)
+        if candidates and candidates[0][0] >= self.appMatchScore:
+            app = candidates[0][1]
             if debug:
-                print('checking ', appName)
-            if appName in searchTextLower:
-                if debug:
-                    print("Command Validated Succesfully")
-                resp = {
-                    "command": f"open {appName}",
-                    "path": app[1]
-                }
-                if debug:
-                    print(resp)
-                return resp
+                print("Command Validated Succesfully")
+            resp = {
+                "command": f"open {app[0].lower()}",
+                "path": app[1]
+            }
+            if debug:
+                print(resp)
+            return resp
         return None
 
     def _validateOpenCommand(self, response, originalCommand):
@@ -119,35 +253,36 @@ class Autocorrect:
         if result:
             return result
         
-        return {"command": "ERROR validating open command"}
+        return dict(self.VALIDATION_ERROR)
     
     def _fallbackCorrect(self, command):
         """Fallback rule-based correction when LLM is not available"""
         commandLower = command.lower()
-        availableCommands = self.commandRegistry.getAvailableCommands()
+        synonyms = self.commandRegistry.synonyms
         
         # Check for open commands with application names
-        if any(word in commandLower for word in ['open', 'launch', 'start', 'run']):
+        if any(word in commandLower for word in synonyms['open <application_name>']):
             result = self._findAppInCommand(commandLower)
             if result:
                 return result
             
-            if any(word in commandLower for word in ['notepad', 'text', 'editor']):
-                return {"command": 'open notepad'}
-            elif any(word in commandLower for word in ['calculator', 'calc']):
-                return {"command": 'open calculator'}
-            elif any(word in commandLower for word in ['browser', 'chrome', 'firefox', 'edge']):
-                return {"command": 'open browser'}
-            else:
-                return {"command": 'open <application_name>'}
+            for application, aliases in self.commandRegistry.applicationAliases.items():
+                if any(word in commandLower for word in aliases):
+                    return {"command": 'open ' + application}
+            return {"command": 'open <application_name>'}
         
         # Other command types
-        elif any(word in commandLower for word in ['lock', 'screen', 'secure']):
-            return {"command": 'lock screen'}
-        elif any(word in commandLower for word in ['play', 'music', 'video', 'resume']):
-            return {"command": 'play media'}
-        elif any(word in commandLower for word in ['pause', 'stop', 'halt']):
-            return {"command": 'pause media'}
+        for cmd in ('lock screen', 'play media', 'pause media'):
+            if any(word in commandLower for word in synonyms[cmd]):
+                return {"command": cmd}
         
         return {"command": command}
     
+    def getStats(self):
+        """Get correction statistics, including how often the fast path skipped the LLM"""
+        stats = {"fastPath": self.intentMatcher.getStats(), "cache": self.correctionCache.getStats()}
+        if self.intentClassifier is not None:
+            stats["classifier"] = self.intentClassifier.getStats()
+        if self.batchScheduler is not None:
+            stats["batching"] = self.batchScheduler.getStats()
+        return stats
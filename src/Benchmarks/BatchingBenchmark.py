@@ -0,0 +1,89 @@
+"""
+Throughput and latency of concurrent LLM corrections with and without the
+micro-batching scheduler, at 1, 4 and 16 concurrent clients.
+
+Without batching, requests are serialized on the model exactly like the
+single autocorrect worker does. Run from the src directory:
+    python -m Benchmarks.BatchingBenchmark --requests-per-client 4
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Utilities.BatchScheduler import BatchScheduler
+from Utilities.ModelOptimizer import ModelOptimizer
+from Benchmarks.PrefillBenchmark import buildPrompt, COMMANDS
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def runClients(generate, prompts, clients, requestsPerClient):
+    """Each client sends its requests back to back; returns the latency report"""
+    latencies = []
+    latencyLock = threading.Lock()
+
+    def client(clientId):
+        for i in range(requestsPerClient):
+            prompt = prompts[(clientId + i) % len(prompts)]
+            start = time.perf_counter()
+            generate(prompt)
+            with latencyLock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "throughputPerSecond": len(latencies) / elapsed,
+        "p50Ms": statistics.median(latencies),
+        "p95Ms": percentile(latencies, 0.95)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests-per-client', type=int, default=4)
+    parser.add_argument('--window-ms', type=float, default=10)
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-tokens', type=int, default=8)
+    args = parser.parse_args()
+
+    optimizer = ModelOptimizer()
+    if not optimizer.loadOptimizedModel():
+        raise SystemExit("Model could not be loaded")
+    template = buildPrompt(20)
+    prompts = [template.replace("{user_input}", command) for command in COMMANDS]
+    optimizer.generateOptimized(prompts[0], maxTokens=1)
+
+    modelLock = threading.Lock()
+
+    def serialized(prompt):
+        with modelLock:
+            return optimizer.generateOptimized(prompt, maxTokens=args.max_tokens)
+
+    scheduler = BatchScheduler(optimizer, args.window_ms, args.max_batch_size)
+
+    def batched(prompt):
+        return scheduler.generate(prompt, maxTokens=args.max_tokens)
+
+    report = {"serialized": [], "batched": []}
+    for clients in args.clients:
+        report["serialized"].append(runClients(serialized, prompts, clients, args.requests_per_client))
+        report["batched"].append(runClients(batched, prompts, clients, args.requests_per_client))
+    report["scheduler"] = scheduler.getStats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compares the TF-IDF intent classifier with constrained LLM correction on
+latency and accuracy, over transcripts that are not among the prompt's
+examples. For the classifier it reports top-1 accuracy, how many
+transcripts clear its confidence thresholds and how accurate those are;
+everything below the thresholds would go to the LLM.
+
+Run from the src directory:
+    python -m Benchmarks.ClassifierBenchmark
+    python -m Benchmarks.ClassifierBenchmark --skip-llm
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from CommandRegistry import CommandRegistry
+from Utilities.IntentClassifier import IntentClassifier
+
+APPS = ["Notepad", "Undertale", "Google Chrome", "Firefox", "Calculator", "Spelunky 2",
+        "Steam", "Discord", "Visual Studio Code", "Spotify", "Microsoft Word", "OBS Studio"]
+
+CASES = [
+    ("open notpad", "open notepad"),
+    ("launch crome", "open google chrome"),
+    ("start spelunky two", "open spelunky 2"),
+    ("open steem", "open steam"),
+    ("fire up discord", "open discord"),
+    ("open vs code", "open visual studio code"),
+    ("launch spotfy", "open spotify"),
+    ("open under tale", "open undertale"),
+    ("run microsoft ward", "open microsoft word"),
+    ("start obs", "open obs studio"),
+    ("open the calculator app", "open calculator"),
+    ("could you lock my pc", "lock screen"),
+    ("lock it", "lock screen"),
+    ("secure the computer", "lock screen"),
+    ("put on some music", "play media"),
+    ("resume the song", "play media"),
+    ("play the video", "play media"),
+    ("pause it", "pause media"),
+    ("halt the video", "pause media"),
+    ("pause the song", "pause media"),
+    ("what time is it", "NO_MATCH"),
+    ("tell me a joke", "NO_MATCH"),
+    ("order a pizza", "NO_MATCH"),
+]
+
+
+class BenchmarkApplications:
+    """Fixed application list with the parts of ApplicationRegistry the classifier uses"""
+
+    def __init__(self, names):
+        self.apps = [[name, f"C:\\Program Files\\{name}\\{name}.exe"] for name in names]
+
+    def addListener(self, listener):
+        pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latencyReport(timings):
+    return {"p50Ms": statistics.median(timings), "p95Ms": percentile(timings, 0.95), "meanMs": statistics.mean(timings)}
+
+
+def measureClassifier(classifier):
+    timings = []
+    correct = confident = confidentCorrect = 0
+    for transcript, expected in CASES:
+        start = time.perf_counter()
+        candidates = classifier.classify(transcript, k=2)
+        timings.append((time.perf_counter() - start) * 1000)
+        answer = candidates[0][1].lower()
+        correct += answer == expected.lower()
+        if classifier.predict(transcript) is not None:
+            confident += 1
+            confidentCorrect += answer == expected.lower()
+    return {
+        "latency": latencyReport(timings),
+        "top1Accuracy": correct / len(CASES),
+        "confidentRate": confident / len(CASES),
+        "confidentAccuracy": confidentCorrect / confident if confident else 0.0
+    }
+
+
+def measureLlm(maxTokens):
+    from Utilities.ModelOptimizer import ModelOptimizer
+
+    optimizer = ModelOptimizer()
+    if not optimizer.loadOptimizedModel():
+        raise SystemExit("Model could not be loaded")
+    with open('Utilities/AutocorrectPrompt.txt', 'r', encoding='utf-8') as file:
+        template = file.read().replace("{detected_apps}", '|'.join(APPS))
+    commands = [cmd for cmd in CommandRegistry().getAvailableCommands() if '<application_name>' not in cmd]
+    optimizer.setAllowedOutputs(commands + ['open ' + app for app in APPS] + ['NO_MATCH'], anchor='"')
+    optimizer.generateOptimized(template.replace("{user_input}", "open notepad"), maxTokens=1)
+
+    timings = []
+    correct = 0
+    for transcript, expected in CASES:
+        prompt = template.replace("{user_input}", transcript) + ' → Output: "'
+        start = time.perf_counter()
+        answer = optimizer.generateOptimized(prompt, maxTokens=maxTokens, constrained=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        correct += (answer or '').lower() == expected.lower()
+    return {"latency": latencyReport(timings), "accuracy": correct / len(CASES)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--skip-llm', action='store_true', help='Only measure the classifier')
+    parser.add_argument('--max-tokens', type=int, default=50)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    classifier = IntentClassifier(CommandRegistry(), BenchmarkApplications(APPS))
+    report = {"cases": len(CASES), "classifierBuildMs": (time.perf_counter() - start) * 1000}
+    report["classifier"] = measureClassifier(classifier)
+    if not args.skip_llm:
+        report["llm"] = measureLlm(args.max_tokens)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
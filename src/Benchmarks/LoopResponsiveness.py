@@ -0,0 +1,80 @@
+"""
+Measures websocket event loop lag while a long autocorrect decode is in flight.
+
+Run from the src directory:
+    python -m Benchmarks.LoopResponsiveness --decode-seconds 3
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from CommandPipeline import CommandPipeline
+from Utilities.LoopMonitor import LoopMonitor
+
+
+class SlowAutocorrect:
+    """Stand-in for Autocorrect that holds a worker thread like a long LLM decode"""
+
+    def __init__(self, decodeSeconds, busy):
+        self.decodeSeconds = decodeSeconds
+        self.busy = busy
+
+    def correctCommand(self, command):
+        end = time.perf_counter() + self.decodeSeconds
+        if self.busy:
+            # Pure Python spin keeps the GIL contended, the worst case for the loop
+            while time.perf_counter() < end:
+                pass
+        else:
+            time.sleep(self.decodeSeconds)
+        return {"command": command}
+
+
+class NullExecutor:
+    def executeCommand(self, execution):
+        return "SUCCESS: " + execution['command']
+
+
+class NullLogger:
+    def writeToFile(self, info, requestId=None, **fields):
+        pass
+
+
+async def measure(decodeSeconds, busy):
+    pipeline = CommandPipeline(NullExecutor(), None, SlowAutocorrect(decodeSeconds, busy), NullLogger())
+    monitor = LoopMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    await pipeline.process("lock screen")
+    elapsed = time.perf_counter() - start
+
+    monitor.stop()
+    pipeline.shutdown()
+    stats = monitor.getStats()
+    stats["decodeSeconds"] = elapsed
+    stats["busyDecode"] = busy
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decode-seconds', type=float, default=3.0)
+    parser.add_argument('--max-lag-ms', type=float, default=50.0, help='Fail if the loop lags longer than this')
+    args = parser.parse_args()
+
+    results = [asyncio.run(measure(args.decode_seconds, busy)) for busy in (False, True)]
+    print(json.dumps(results, indent=2))
+
+    worst = max(result["maxLagMs"] for result in results)
+    if worst > args.max_lag_ms:
+        print(f"FAIL: event loop lagged {worst:.1f} ms during decode")
+        raise SystemExit(1)
+    print(f"OK: worst event loop lag {worst:.1f} ms during decode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Offline end-to-end benchmark of the websocket server. Starts the real
+create_handler pipeline on a local port, replays a corpus of recorded
+utterances through it and reports end-to-end and per-stage latency
+percentiles, throughput and peak resident memory as JSON.
+
+The corpus is a directory of 16 kHz mono 16-bit .wav files and/or .txt
+files with one text command per line. An optional apps.json in the same
+format as applications_cache.json fixes the application list, so runs on
+different machines are comparable.
+
+Commands are executed by a side-effect-free stand-in, nothing is opened,
+locked or played. With --mock-llm a deterministic stand-in replaces the
+LLM, so the benchmark runs without torch and the model.
+
+Run from the src directory:
+    python -m Benchmarks.PipelineBenchmark path/to/corpus --mock-llm --output run.json
+    python -m Benchmarks.PipelineBenchmark path/to/corpus --mock-llm --baseline run.json
+    python -m Benchmarks.PipelineBenchmark path/to/corpus --mock-llm --connections 8 --stt-workers 4
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import psutil
+import websockets
+
+from Autocorrect import Autocorrect
+from Benchmarks.VadBenchmark import readPcm
+from CommandPipeline import CommandPipeline
+from Protocol import STATS, encodeMessage, parseControlMessage
+from Utilities.ApplicationIndex import normalizeName, characterGrams
+from Utilities.ApplicationRegistry import ApplicationRegistry
+from Utilities.CorrectionCache import CorrectionCache
+from Utilities.FileLogger import FileLogger
+import server
+
+
+class StandInExecutor:
+    """Answers like Executor without opening applications, locking the screen or sending media keys"""
+
+    def __init__(self, delayMs=0.0):
+        self.delay = delayMs / 1000
+        self.executed = 0
+
+    def executeCommand(self, execution):
+        if self.delay:
+            time.sleep(self.delay)
+        self.executed += 1
+        command = execution['command']
+        if command.startswith("open "):
+            if not execution.get('path'):
+                return "ERROR: Application Path not Listed"
+            return "SUCCESS: Opened " + command[5:]
+        if command in ('lock screen', 'play media', 'pause media'):
+            return "SUCCESS: " + command
+        return f"EXECUTION ERROR: 404 Command Not Found: '{command}'"
+
+
+class TextOnlyInterpreter:
+    """Stands in for Interpreter when the corpus has no audio, so vosk isn't needed"""
+
+    def openSession(self):
+        return None
+
+    def closeSession(self, session):
+        pass
+
+    def parseSpeech(self, speech, session=None):
+        raise RuntimeError("Audio sent to a text-only benchmark run")
+
+    def getStats(self):
+        return {}
+
+    def shutdown(self):
+        pass
+
+
+class MockModelOptimizer:
+    """
+    Deterministic stand-in for ModelOptimizer. Answers with the allowed
+    output whose character trigrams best overlap the user input, or
+    NO_MATCH below minSimilarity, after sleeping for a fixed prefill and
+    per-token decode time.
+    """
+
+    def __init__(self, latencyTracker=None, prefillMs=40.0, tokenMs=15.0, answerTokens=4, minSimilarity=0.25):
+        self.latencyTracker = latencyTracker
+        self.prefillMs = prefillMs
+        self.tokenMs = tokenMs
+        self.answerTokens = answerTokens
+        self.minSimilarity = minSimilarity
+        self.allowedOutputs = []
+        self.model_loaded = True
+
+    def loadOptimizedModel(self, modelName=None):
+        return True
+
+    def isModelLoaded(self):
+        return True
+
+    def setAllowedOutputs(self, outputs, anchor=''):
+        self.allowedOutputs = [(output, characterGrams(normalizeName(output))) for output in outputs]
+
+    def setPromptPrefix(self, prefix):
+        pass
+
+    def _answer(self, prompt):
+        userInput = prompt.rsplit("Now correct this input: ", 1)[-1].split(' → Output:')[0]
+        grams = characterGrams(normalizeName(userInput))
+        best, bestSimilarity = 'NO_MATCH', self.minSimilarity
+        for output, outputGrams in self.allowedOutputs:
+            similarity = 2 * len(grams & outputGrams) / (len(grams) + len(outputGrams))
+            if similarity > bestSimilarity:
+                best, bestSimilarity = output, similarity
+        return best
+
+    def _simulate(self, rows):
+        time.sleep(self.prefillMs * rows / 1000)
+        decodeSeconds = self.tokenMs * self.answerTokens / 1000
+        time.sleep(decodeSeconds)
+        if self.latencyTracker is not None:
+            self.latencyTracker.record("llm.prefill", self.prefillMs * rows)
+            self.latencyTracker.record("llm.decode", decodeSeconds * 1000)
+
+    def generateOptimized(self, prompt, maxTokens=50, temperature=0.1, constrained=False):
+        self._simulate(1)
+        return self._answer(prompt)
+
+    def generateBatch(self, prompts, maxTokens=50, temperature=0.1, constrained=False):
+        self._simulate(len(prompts))
+        return [self._answer(prompt) for prompt in prompts]
+
+
+class PeakMemory:
+    """Samples the process's resident set size on a background thread"""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start = self.peak = self.process.memory_info().rss
+        self.running = False
+
+    def __enter__(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+        self._sample()
+
+    def _sample(self):
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def _run(self):
+        while self.running:
+            self._sample()
+            time.sleep(self.interval)
+
+
+def loadCorpus(corpus):
+    """Return the corpus as a list of (kind, name, payload)"""
+    utterances = []
+    for path in sorted(glob.glob(os.path.join(corpus, '*.wav'))):
+        utterances.append(('audio', os.path.basename(path), readPcm(path)))
+    for path in sorted(glob.glob(os.path.join(corpus, '*.txt'))):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    utterances.append(('text', line.strip(), line.strip()))
+    return utterances
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {"p50Ms": pick(0.50), "p95Ms": pick(0.95), "p99Ms": pick(0.99),
+            "meanMs": statistics.mean(ordered), "maxMs": ordered[-1]}
+
+
+async def replay(port, utterances, repeat, latencies, failures, commandErrors):
+    async with websockets.connect(f'ws://localhost:{port}', max_size=None) as websocket:
+        for _ in range(repeat):
+            for kind, name, payload in utterances:
+                start = time.perf_counter()
+                try:
+                    await websocket.send(payload)
+                    response = await websocket.recv()
+                except websockets.exceptions.ConnectionClosed:
+                    failures.append(name)
+                    return
+                latencies.append((time.perf_counter() - start) * 1000)
+                if 'ERROR' in response:
+                    commandErrors.append(name)
+
+
+async def fetchStats(port):
+    async with websockets.connect(f'ws://localhost:{port}') as websocket:
+        await websocket.send(encodeMessage(STATS))
+        return parseControlMessage(await websocket.recv())
+
+
+async def run(args, utterances, execute, interpret, autocorrect, file):
+    pipeline = CommandPipeline(execute, interpret, autocorrect, file, sttWorkers=max(2, 2 * args.stt_workers))
+    handler = server.create_handler(execute, interpret, autocorrect, file, pipeline)
+    latencies, failures, commandErrors = [], [], []
+    async with websockets.serve(handler, 'localhost', 0, max_size=None) as websocketServer:
+        port = websocketServer.sockets[0].getsockname()[1]
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                replay(port, utterances, args.repeat, latencies, failures, commandErrors) for _ in range(args.connections)
+            ))
+            elapsed = time.perf_counter() - start
+        stats = await fetchStats(port)
+    pipeline.shutdown()
+    return {
+        "requests": len(latencies),
+        # Connections lost mid-run, and commands answered with an error
+        "failures": len(failures),
+        "commandErrors": len(commandErrors),
+        "seconds": elapsed,
+        "throughputPerSecond": len(latencies) / elapsed,
+        "endToEnd": percentiles(latencies),
+        "stages": stats["latency"],
+        "startRssMegabytes": memory.start / 1024 / 1024,
+        "peakRssMegabytes": memory.peak / 1024 / 1024
+    }
+
+
+def compare(report, baseline):
+    """Ratio of this run to the baseline for throughput and every p50/p95"""
+    ratios = {"throughput": report["throughputPerSecond"] / baseline["throughputPerSecond"]}
+    spans = {"endToEnd": (report["endToEnd"], baseline["endToEnd"])}
+    for name, stats in report["stages"].items():
+        if name in baseline["stages"]:
+            spans[name] = (stats, baseline["stages"][name])
+    for name, (current, previous) in spans.items():
+        for key in ("p50Ms", "p95Ms"):
+            if previous[key] > 0:
+                ratios[f"{name}.{key}"] = current[key] / previous[key]
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', help='Directory of .wav and .txt utterances, optionally with apps.json')
+    parser.add_argument('--mock-llm', action='store_true', help='Use the deterministic LLM stand-in')
+    parser.add_argument('--backend', choices=Autocorrect.BACKENDS, default='llm')
+    parser.add_argument('--connections', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='Times each connection replays the corpus')
+    parser.add_argument('--stt-workers', type=int, default=0, help='Speech worker processes, 0 decodes in process')
+    parser.add_argument('--execute-ms', type=float, default=0.0, help='Simulated execution time')
+    parser.add_argument('--output', help='Write the report to this JSON file')
+    parser.add_argument('--baseline', help='Earlier report to compare against')
+    args = parser.parse_args()
+
+    utterances = loadCorpus(args.corpus)
+    if not utterances:
+        raise SystemExit(f"No .wav or .txt utterances in {args.corpus}")
+
+    appsPath = os.path.join(args.corpus, 'apps.json')
+    appRegistry = ApplicationRegistry(appsPath) if os.path.exists(appsPath) else None
+    autocorrect = Autocorrect(loadModel=False, backend=args.backend, appRegistry=appRegistry)
+    # A fresh in-memory cache, so earlier runs don't turn LLM calls into hits and nothing is persisted
+    autocorrect.correctionCache = CorrectionCache()
+    if args.mock_llm:
+        autocorrect.modelOptimizer = MockModelOptimizer(autocorrect.latencyTracker)
+        autocorrect.prompt = autocorrect.setupPrompt()
+    elif not autocorrect.loadModel():
+        raise SystemExit("Model could not be loaded, use --mock-llm")
+
+    if any(kind == 'audio' for kind, _, _ in utterances):
+        from interpreter import Interpreter
+        interpret = Interpreter(sttWorkers=args.stt_workers)
+    else:
+        interpret = TextOnlyInterpreter()
+
+    logDirectory = tempfile.mkdtemp(prefix='pipeline-benchmark-')
+    file = FileLogger(os.path.join(logDirectory, 'logging.txt'))
+    file.setupLogging()
+
+    report = asyncio.run(run(args, utterances, StandInExecutor(args.execute_ms), interpret, autocorrect, file))
+    interpret.shutdown()
+    file.close()
+    report["config"] = {
+        "corpus": os.path.abspath(args.corpus),
+        "utterances": len(utterances),
+        "mockLlm": args.mock_llm,
+        "backend": args.backend,
+        "connections": args.connections,
+        "sttWorkers": args.stt_workers,
+        "repeat": args.repeat,
+        "timestamp": time.time()
+    }
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as baselineFile:
+            report["comparedToBaseline"] = compare(report, json.load(baselineFile))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as outputFile:
+            json.dump(report, outputFile, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
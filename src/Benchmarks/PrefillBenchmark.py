@@ -0,0 +1,85 @@
+"""
+Compares autocorrect prefill time with and without the cached prompt prefix.
+Each measurement generates a single token, so it is dominated by prefill.
+Prompts are built like Autocorrect builds them: the candidate apps and the
+transcript change per request and the cached prefix ends before the line
+listing the candidates.
+
+Run from the src directory:
+    python -m Benchmarks.PrefillBenchmark --apps 40 --runs 10
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import torch
+
+from Autocorrect import Autocorrect
+from Utilities.ModelOptimizer import ModelOptimizer
+
+COMMANDS = ["open notepad", "lock the screen", "resume playback", "launch spelunky two", "what's the weather"]
+
+
+def loadTemplate():
+    with open('Utilities/AutocorrectPrompt.txt', 'r') as file:
+        return file.read()
+
+
+def buildPrompt(template, command, appCount, offset=0):
+    """Fill the template with a transcript and appCount candidate apps, different ones per offset"""
+    apps = '|'.join(f"Application {offset + i}" for i in range(appCount))
+    return template.replace("{detected_apps}", apps).replace("{user_input}", command)
+
+
+def timePrefill(optimizer, prompts):
+    timings = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        optimizer.generateOptimized(prompt, maxTokens=1)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"medianMs": statistics.median(timings), "meanMs": statistics.mean(timings), "runs": len(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', type=int, default=8,
+                        help='Candidate apps listed in each prompt, Autocorrect lists up to 8. '
+                             'Prompts longer than the optimizer\'s maxPromptTokens are truncated')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    optimizer = ModelOptimizer()
+    optimizer.device = "cpu"
+    if not optimizer.loadOptimizedModel():
+        raise SystemExit("Model could not be loaded")
+
+    template = loadTemplate()
+    prompts = [buildPrompt(template, COMMANDS[i % len(COMMANDS)], args.apps, i) for i in range(args.runs)]
+    # The same prefix production caches
+    prefix = Autocorrect.promptPrefix(template)
+
+    # Warm up kernels (and torch.compile) before timing anything
+    optimizer.generateOptimized(prompts[0], maxTokens=1)
+    full = timePrefill(optimizer, prompts)
+
+    optimizer.setPromptPrefix(prefix)
+    optimizer.generateOptimized(prompts[0], maxTokens=1)
+    cached = timePrefill(optimizer, prompts)
+
+    report = {
+        "device": "cpu",
+        "threads": torch.get_num_threads(),
+        "promptTokens": len(optimizer.tokenizer(prompts[0])['input_ids']),
+        "maxPromptTokens": optimizer.maxPromptTokens,
+        "prefixTokens": optimizer.prefixIds.shape[1],
+        "fullPrefill": full,
+        "cachedPrefix": cached,
+        "speedup": full["medianMs"] / cached["medianMs"]
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
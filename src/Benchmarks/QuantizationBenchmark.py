@@ -0,0 +1,89 @@
+"""
+Compares the float32 and dynamic int8 CPU paths of ModelOptimizer on
+resident memory, load time, tokens per second and command-match accuracy.
+
+Accuracy is measured on the examples of AutocorrectPrompt.txt with
+constrained decoding. Those examples are also in the prompt, so the
+absolute number is optimistic; the difference between modes is what
+matters. Each mode runs in its own process so memory is measured cleanly.
+
+Run from the src directory:
+    python -m Benchmarks.QuantizationBenchmark
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import psutil
+
+APPS = ["Notepad", "Undertale", "Google Chrome", "Firefox", "Calculator"]
+COMMANDS = ["lock screen", "play media", "pause media"]
+
+
+def measureMode(quantization, maxTokens):
+    from Utilities.ModelOptimizer import ModelOptimizer
+    from Utilities.PromptExamples import loadPromptExamples
+
+    process = psutil.Process()
+    baseline = process.memory_info().rss
+    optimizer = ModelOptimizer(quantization=quantization)
+    optimizer.device = "cpu"
+    start = time.perf_counter()
+    if not optimizer.loadOptimizedModel():
+        raise SystemExit("Model could not be loaded")
+    loadSeconds = time.perf_counter() - start
+    residentBytes = process.memory_info().rss - baseline
+
+    with open('Utilities/AutocorrectPrompt.txt', 'r', encoding='utf-8') as file:
+        template = file.read().replace("{detected_apps}", '|'.join(APPS))
+    optimizer.setAllowedOutputs(COMMANDS + ['open ' + app for app in APPS] + ['NO_MATCH'], anchor='"')
+
+    # Throughput of free-running generation
+    prompt = template.replace("{user_input}", "open notepad")
+    optimizer.generateOptimized(prompt, maxTokens=1)
+    start = time.perf_counter()
+    response = optimizer.generateOptimized(prompt, maxTokens=maxTokens)
+    generatedTokens = len(optimizer.tokenizer(response, add_special_tokens=False)['input_ids'])
+    tokensPerSecond = generatedTokens / (time.perf_counter() - start)
+
+    examples = loadPromptExamples()
+    correct = 0
+    for userInput, expected in examples:
+        answer = optimizer.generateOptimized(template.replace("{user_input}", userInput) + ' → Output: "', constrained=True)
+        correct += (answer or '').lower() == expected.lower()
+
+    return {
+        "quantization": quantization or "float32",
+        "loadSeconds": loadSeconds,
+        "residentMegabytes": residentBytes / 1024 / 1024,
+        "tokensPerSecond": tokensPerSecond,
+        "accuracy": correct / len(examples),
+        "examples": len(examples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['float32', 'int8'], help='Measure a single mode in this process')
+    parser.add_argument('--max-tokens', type=int, default=32)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measureMode(None if args.mode == 'float32' else 'int8', args.max_tokens)))
+        return
+
+    results = []
+    for mode in ('float32', 'int8'):
+        completed = subprocess.run(
+            [sys.executable, '-m', 'Benchmarks.QuantizationBenchmark', '--mode', mode, '--max-tokens', str(args.max_tokens)],
+            capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
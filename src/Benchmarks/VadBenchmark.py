@@ -0,0 +1,92 @@
+"""
+Reports how much audio voice activity trimming removes before Vosk decoding
+and how much decode latency it saves, over a directory of recorded
+16 kHz mono 16-bit WAV files.
+
+Run from the src directory:
+    python -m Benchmarks.VadBenchmark path/to/corpus
+    python -m Benchmarks.VadBenchmark path/to/corpus --no-decode
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+import wave
+
+from Utilities.VoiceActivityDetector import VoiceActivityDetector
+
+
+def readPcm(path):
+    with wave.open(path, 'rb') as wav:
+        if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{path} is not 16 kHz mono 16-bit PCM")
+        return wav.readframes(wav.getnframes())
+
+
+def decode(model, pcm):
+    """Decode pcm with a fresh recognizer and return (text, seconds)"""
+    from vosk import KaldiRecognizer
+    recognizer = KaldiRecognizer(model, 16000)
+    start = time.perf_counter()
+    recognizer.AcceptWaveform(pcm)
+    text = json.loads(recognizer.FinalResult()).get('text', '')
+    return text, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', help='Directory of .wav files')
+    parser.add_argument('--model', default='../models/vosk-model-small-en-us-0.15')
+    parser.add_argument('--no-decode', action='store_true', help='Only measure trimmed audio, skip Vosk')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    model = None
+    if not args.no_decode:
+        from vosk import Model
+        model = Model(args.model)
+
+    vad = VoiceActivityDetector(16000)
+    files = []
+    totals = {"trimSeconds": 0.0, "fullDecodeSeconds": 0.0, "trimmedDecodeSeconds": 0.0, "transcriptMismatches": 0}
+    for path in sorted(glob.glob(os.path.join(args.corpus, '*.wav'))):
+        pcm = readPcm(path)
+        start = time.perf_counter()
+        trimmed = vad.trim(pcm)
+        trimSeconds = time.perf_counter() - start
+        totals["trimSeconds"] += trimSeconds
+        entry = {
+            "file": os.path.basename(path),
+            "audioSeconds": len(pcm) / 32000,
+            "decodedSeconds": len(trimmed) / 32000,
+            "trimMs": trimSeconds * 1000
+        }
+
+        if model is not None:
+            fullText, fullSeconds = decode(model, pcm)
+            trimmedText, trimmedSeconds = decode(model, trimmed)
+            totals["fullDecodeSeconds"] += fullSeconds
+            totals["trimmedDecodeSeconds"] += trimmedSeconds + trimSeconds
+            totals["transcriptMismatches"] += fullText != trimmedText
+            entry.update({
+                "fullDecodeMs": fullSeconds * 1000,
+                "trimmedDecodeMs": trimmedSeconds * 1000,
+                "fullText": fullText,
+                "trimmedText": trimmedText
+            })
+        files.append(entry)
+
+    report = {"files": files, "vad": vad.getStats(), "totals": totals}
+    if model is not None and totals["fullDecodeSeconds"]:
+        report["latencySaving"] = 1.0 - totals["trimmedDecodeSeconds"] / totals["fullDecodeSeconds"]
+
+    print(json.dumps({k: v for k, v in report.items() if k != "files"}, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
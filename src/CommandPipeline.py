@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Utilities.LatencyTracker import LatencyTracker
+
+
+class PipelineStage:
+    """A bounded worker pool that runs one blocking stage of the command pipeline"""
+
+    def __init__(self, name, workers, maxPending):
+        self.name = name
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        # Limits how much work can be queued against the pool at once
+        self.slots = asyncio.Semaphore(maxPending)
+        self.pending = 0
+        self.completed = 0
+
+    async def run(self, func, *args):
+        """Run func on the stage's pool and await its result from the event loop"""
+        async with self.slots:
+            self.pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.pool, func, *args)
+            finally:
+                self.pending -= 1
+                self.completed += 1
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class CommandPipeline:
+    """
+    Staged speech -> autocorrect -> execute pipeline. Every stage runs on its
+    own bounded thread pool so the websocket event loop never blocks on
+    Vosk decoding, LLM generation or command execution.
+    """
+
+    def __init__(self, execute, interpret, autocorrect, file,
+                 sttWorkers=2, correctWorkers=None, executeWorkers=2, maxPendingPerStage=32,
+                 latencyTracker=None):
+        self.execute = execute
+        self.interpret = interpret
+        self.autocorrect = autocorrect
+        self.file = file
+
+        # The LLM is a single shared model, so autocorrect defaults to one worker,
+        # or one per batch slot when concurrent corrections are micro-batched
+        if correctWorkers is None:
+            batchScheduler = getattr(autocorrect, 'batchScheduler', None)
+            correctWorkers = batchScheduler.maxBatchSize if batchScheduler else 1
+        self.sttStage = PipelineStage('stt', sttWorkers, maxPendingPerStage)
+        self.correctStage = PipelineStage('autocorrect', correctWorkers, maxPendingPerStage)
+        self.executeStage = PipelineStage('execute', executeWorkers, maxPendingPerStage)
+
+        # Stage latencies go into the same histograms as autocorrect's finer spans
+        if latencyTracker is None:
+            latencyTracker = getattr(autocorrect, 'latencyTracker', None) or LatencyTracker()
+        self.latencyTracker = latencyTracker
+
+        # Ties together the log records of one command
+        self.requestIds = itertools.count(1)
+
+    def newRequestId(self):
+        return next(self.requestIds)
+
+    async def parseSpeech(self, audio, session=None, decoder=None):
+        return await self.sttStage.run(self._decodeAndParse, audio, session, decoder)
+
+    def _decodeAndParse(self, audio, session, decoder):
+        """Convert audio from the client's format and transcribe it, both on an STT worker"""
+        if decoder is not None:
+            audio = decoder.decodeUtterance(audio)
+        return self.interpret.parseSpeech(audio, session)
+
+    async def acceptAudioChunk(self, chunk, session):
+        return await self.sttStage.run(self.interpret.acceptChunk, session, chunk)
+
+    async def finishStream(self, session):
+        return await self.sttStage.run(self.interpret.finishStream, session)
+
+    async def correctCommand(self, message):
+        return await self.correctStage.run(self.autocorrect.correctCommand, message)
+
+    async def executeCommand(self, correctedMessage):
+        return await self.executeStage.run(self.execute.executeCommand, correctedMessage)
+
+    async def process(self, message, session=None, requestId=None, decoder=None):
+        """
+        Run a raw client message (text or audio bytes) through every stage.
+        Audio in another format than 16 kHz mono PCM is converted by decoder.
+        """
+        if requestId is None:
+            requestId = self.newRequestId()
+        start = time.perf_counter()
+        if isinstance(message, bytes):
+            self.file.writeToFile("Audio Message received from CLIENT: 'PARSING'", requestId, audioBytes=len(message))
+            message = await self.parseSpeech(message, session, decoder)
+            sttMs = (time.perf_counter() - start) * 1000
+            self.latencyTracker.record("stt", sttMs)
+            self.file.writeToFile("Speech parsed", requestId, sttMs=sttMs)
+        result = await self.processTranscript(message, requestId)
+        self.latencyTracker.record("endToEnd", (time.perf_counter() - start) * 1000)
+        return result
+
+    async def processTranscript(self, message, requestId=None):
+        """Run an already transcribed command through autocorrect and execution"""
+        if requestId is None:
+            requestId = self.newRequestId()
+        self.file.writeToFile("Message Received from CLIENT: '" + message + "'", requestId)
+
+        start = time.perf_counter()
+        correctedMessage = await self.correctCommand(message)
+        corrected = time.perf_counter()
+        print(correctedMessage)
+        correctMs = (corrected - start) * 1000
+        self.latencyTracker.record("autocorrect", correctMs)
+        self.file.writeToFile("Autocorrected Message: '" + correctedMessage['command'] + "'", requestId,
+                              correctMs=correctMs)
+
+        result = await self.executeCommand(correctedMessage)
+        executeMs = (time.perf_counter() - corrected) * 1000
+        self.latencyTracker.record("execute", executeMs)
+        self.file.writeToFile("Response from EXECUTOR: '" + result + "'", requestId,
+                              executeMs=executeMs)
+        return result
+
+    def getStats(self):
+        """Get pending and completed counts for every stage"""
+        return {
+            stage.name: {"pending": stage.pending, "completed": stage.completed}
+            for stage in (self.sttStage, self.correctStage, self.executeStage)
+        }
+
+    def shutdown(self):
+        for stage in (self.sttStage, self.correctStage, self.executeStage):
+            stage.shutdown()
@@ -7,5 +7,33 @@ class CommandRegistry:
             'pause media' : 'Pauses media'
         }
 
+        # Words that signal each command in a transcript
+        self.synonyms = {
+            'open <application_name>' : ['open', 'launch', 'start', 'run'],
+            'lock screen' : ['lock', 'screen', 'secure'],
+            'play media' : ['play', 'music', 'video', 'resume'],
+            'pause media' : ['pause', 'stop', 'halt']
+        }
+
+        # Generic application words and the application they usually mean
+        self.applicationAliases = {
+            'notepad' : ['notepad', 'text', 'editor'],
+            'calculator' : ['calculator', 'calc'],
+            'browser' : ['browser', 'chrome', 'firefox', 'edge']
+        }
+
+        self.listeners = []
+
     def getAvailableCommands(self):
-        return list(self.commands.keys())
\ No newline at end of file
+        return list(self.commands.keys())
+
+    def addCommand(self, command, description, synonyms=None):
+        """Register a new command and notify listeners"""
+        self.commands[command] = description
+        self.synonyms[command] = list(synonyms or [])
+        for listener in self.listeners:
+            listener(command)
+
+    def addListener(self, listener):
+        """Call listener(command) whenever a command is added"""
+        self.listeners.append(listener)
@@ -0,0 +1,302 @@
+"""
+Non-interactive load generator for server.py. Opens N websocket
+connections and replays scripted text commands and recorded audio,
+recording per-request latency, errors and throughput.
+
+Closed loop: every connection sends its next request as soon as the
+previous answer arrived (plus --think-ms). Open loop: requests are
+scheduled at --rate per second regardless of how fast answers come back,
+and latency is measured from the scheduled time, so queueing delay is
+included once the server falls behind.
+
+With --pipeline-depth above 1 requests are sent in id envelopes and each
+connection keeps that many in flight, matching answers by replyTo.
+Otherwise the raw lock-step protocol is used.
+
+Audio files may use any sample rate and channel count, as long as they all
+share one; anything but 16 kHz mono is negotiated with an audio_format
+message on connect. --encoding mulaw or alaw sends 8-bit G.711 instead
+of 16-bit PCM.
+
+Run from the src directory while the server is running:
+    python LoadClient.py --script commands.txt --connections 8 --duration 30
+    python LoadClient.py --script commands.txt --mode open --rate 20 --connections 16
+    python LoadClient.py --script commands.txt --sweep 1 2 4 8 16 32
+    python LoadClient.py --script commands.txt --connections 2 --pipeline-depth 8
+    python LoadClient.py --audio "recordings/*.wav" --encoding mulaw
+"""
+
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import random
+import statistics
+import time
+import wave
+
+import websockets
+
+from Protocol import (COMMAND, RESULT, BUSY, BUSY_RESPONSE, AUDIO_FORMAT, AUDIO_UTTERANCE, encodeMessage,
+                      encodeEnvelope, parseControlMessage)
+from Utilities.AudioDecoder import PCM16, ENCODINGS, encodeG711
+
+
+def loadRequests(scriptPath=None, audioPattern=None, encoding=PCM16):
+    """
+    Text commands, one per line, followed by 16-bit audio files. Returns
+    the requests and the audio format to negotiate.
+    """
+    requests = []
+    audioFormat = {"sampleRate": 16000, "channels": 1, "encoding": encoding}
+    if scriptPath:
+        with open(scriptPath, 'r', encoding='utf-8') as file:
+            requests += [line.strip() for line in file if line.strip()]
+    formats = set()
+    for path in sorted(glob.glob(audioPattern)) if audioPattern else []:
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path} is not 16-bit PCM")
+            formats.add((wav.getframerate(), wav.getnchannels()))
+            pcm = wav.readframes(wav.getnframes())
+        requests.append(pcm if encoding == PCM16 else encodeG711(pcm, encoding))
+    if len(formats) > 1:
+        raise ValueError(f"Audio files mix formats {sorted(formats)}, a connection has one")
+    if formats:
+        audioFormat["sampleRate"], audioFormat["channels"] = formats.pop()
+    return requests, audioFormat
+
+
+async def negotiateFormat(websocket, audioFormat):
+    """Tell the server the audio format unless it is the default 16 kHz mono PCM"""
+    if audioFormat == {"sampleRate": 16000, "channels": 1, "encoding": PCM16}:
+        return
+    await websocket.send(encodeMessage(AUDIO_FORMAT, **audioFormat))
+    reply = parseControlMessage(await websocket.recv())
+    if reply is None or reply['type'] != AUDIO_FORMAT:
+        raise ValueError(f"Server rejected audio format {audioFormat}: {reply}")
+
+
+class LoadReport:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        # Requests the server turned away because it was at capacity
+        self.busy = 0
+        self.failures = 0
+        self.start = time.perf_counter()
+
+    def record(self, latencyMs, response):
+        if response.startswith('BUSY'):
+            self.busy += 1
+            return
+        self.latencies.append(latencyMs)
+        if 'ERROR' in response:
+            self.errors += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        completed = len(self.latencies)
+        ordered = sorted(self.latencies)
+        pick = lambda fraction: ordered[min(completed - 1, int(fraction * completed))] if completed else 0.0
+        return {
+            "completed": completed,
+            "failures": self.failures,
+            "busy": self.busy,
+            "busyRate": self.busy / (completed + self.busy) if completed + self.busy else 0.0,
+            "errorRate": self.errors / completed if completed else 0.0,
+            "failureRate": self.failures / (completed + self.failures) if completed + self.failures else 0.0,
+            "throughputPerSecond": completed / elapsed,
+            "p50Ms": pick(0.50),
+            "p95Ms": pick(0.95),
+            "p99Ms": pick(0.99),
+            "meanMs": statistics.mean(ordered) if ordered else 0.0,
+            "seconds": elapsed
+        }
+
+
+class LockStepClient:
+    """Raw protocol: send the command or audio and wait for the next reply"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def request(self, payload, timeout):
+        await self.websocket.send(payload)
+        return await asyncio.wait_for(self.websocket.recv(), timeout)
+
+
+class EnvelopeClient:
+    """Sends requests in id envelopes and resolves each one when its replyTo arrives"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pending = {}
+        self.requestIds = itertools.count(1)
+        self.reader = asyncio.get_running_loop().create_task(self._read())
+
+    async def request(self, payload, timeout):
+        requestId = next(self.requestIds)
+        reply = asyncio.get_running_loop().create_future()
+        self.pending[requestId] = reply
+        try:
+            if isinstance(payload, bytes):
+                await self.websocket.send(encodeEnvelope(AUDIO_UTTERANCE, requestId, payload))
+            else:
+                await self.websocket.send(encodeMessage(COMMAND, id=requestId, text=payload))
+            return await asyncio.wait_for(reply, timeout)
+        finally:
+            self.pending.pop(requestId, None)
+
+    async def _read(self):
+        try:
+            async for message in self.websocket:
+                reply = parseControlMessage(message)
+                if reply is None:
+                    continue
+                future = self.pending.get(reply.get('replyTo'))
+                if future is not None and not future.done():
+                    if reply['type'] == RESULT:
+                        future.set_result(str(reply.get('result')))
+                    elif reply['type'] == BUSY:
+                        future.set_result(BUSY_RESPONSE)
+                    else:
+                        future.set_result("ERROR: " + str(reply.get('error')))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(websockets.exceptions.ConnectionClosedError(None, None))
+
+
+def openClient(websocket, depth):
+    return EnvelopeClient(websocket) if depth > 1 else LockStepClient(websocket)
+
+
+async def closedLoopWorker(client, requests, offset, deadline, thinkSeconds, timeout, report):
+    for payload in itertools.islice(itertools.cycle(requests), offset, None):
+        if time.perf_counter() >= deadline:
+            return
+        start = time.perf_counter()
+        try:
+            response = await client.request(payload, timeout)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+            report.failures += 1
+            return
+        report.record((time.perf_counter() - start) * 1000, response)
+        if thinkSeconds:
+            await asyncio.sleep(thinkSeconds)
+
+
+async def closedLoopConnection(uri, requests, audioFormat, deadline, thinkSeconds, timeout, report, depth):
+    async with websockets.connect(uri, max_size=None) as websocket:
+        await negotiateFormat(websocket, audioFormat)
+        client = openClient(websocket, depth)
+        await asyncio.gather(*(
+            closedLoopWorker(client, requests, offset, deadline, thinkSeconds, timeout, report)
+            for offset in range(depth)
+        ))
+
+
+async def openLoopWorker(client, scheduled, timeout, report):
+    while True:
+        item = await scheduled.get()
+        if item is None:
+            return
+        scheduledAt, payload = item
+        try:
+            response = await client.request(payload, timeout)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+            report.failures += 1
+            return
+        report.record((time.perf_counter() - scheduledAt) * 1000, response)
+
+
+async def openLoopConnection(uri, audioFormat, scheduled, timeout, report, depth):
+    """Take scheduled requests off the shared queue, keeping up to depth in flight"""
+    async with websockets.connect(uri, max_size=None) as websocket:
+        await negotiateFormat(websocket, audioFormat)
+        client = openClient(websocket, depth)
+        await asyncio.gather(*(openLoopWorker(client, scheduled, timeout, report) for _ in range(depth)))
+
+
+async def schedule(scheduled, requests, rate, deadline, workers, poisson):
+    """Enqueue requests at rate per second, with exponential gaps when poisson is set"""
+    nextAt = time.perf_counter()
+    for payload in itertools.cycle(requests):
+        if nextAt >= deadline:
+            break
+        await asyncio.sleep(max(0.0, nextAt - time.perf_counter()))
+        scheduled.put_nowait((nextAt, payload))
+        nextAt += random.expovariate(rate) if poisson else 1 / rate
+    for _ in range(workers):
+        scheduled.put_nowait(None)
+
+
+async def runLoad(args, requests, audioFormat, connections):
+    uri = f'ws://{args.host}:{args.port}'
+    report = LoadReport()
+    deadline = time.perf_counter() + args.duration
+    if args.mode == 'closed':
+        outcomes = await asyncio.gather(*(
+            closedLoopConnection(uri, requests, audioFormat, deadline, args.think_ms / 1000, args.timeout, report, args.pipeline_depth)
+            for _ in range(connections)
+        ), return_exceptions=True)
+    else:
+        scheduled = asyncio.Queue()
+        workers = [openLoopConnection(uri, audioFormat, scheduled, args.timeout, report, args.pipeline_depth) for _ in range(connections)]
+        outcomes = await asyncio.gather(schedule(scheduled, requests, args.rate, deadline,
+                                                 connections * args.pipeline_depth, args.poisson),
+                                        *workers, return_exceptions=True)
+    # Connections that could not be opened or broke with an unexpected error
+    errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    if errors:
+        print(f"{len(errors)} connections failed, first error: {errors[0]!r}")
+    report.failures += len(errors)
+    summary = report.summary()
+    summary.update({"mode": args.mode, "connections": connections, "pipelineDepth": args.pipeline_depth})
+    if args.mode == 'open':
+        summary["offeredRatePerSecond"] = args.rate
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=12345)
+    parser.add_argument('--script', help='Text commands, one per line')
+    parser.add_argument('--audio', help='Glob of 16-bit WAV files sharing one rate and channel count, e.g. "recordings/*.wav"')
+    parser.add_argument('--encoding', choices=ENCODINGS, default=PCM16, help='Audio encoding on the wire')
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--rate', type=float, default=10.0, help='Open loop: requests per second over all connections')
+    parser.add_argument('--poisson', action='store_true', help='Open loop: exponential inter-arrival times')
+    parser.add_argument('--pipeline-depth', type=int, default=1, help='Requests in flight per connection, above 1 uses id envelopes')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Closed loop: pause between requests')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per run')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request counts as failed')
+    parser.add_argument('--sweep', type=int, nargs='+', help='Run once per connection count to find where throughput saturates')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    requests, audioFormat = loadRequests(args.script, args.audio, args.encoding)
+    if not requests:
+        raise SystemExit("Nothing to send, pass --script and/or --audio")
+
+    results = []
+    for connections in args.sweep or [args.connections]:
+        summary = asyncio.run(runLoad(args, requests, audioFormat, connections))
+        results.append(summary)
+        print(f"{connections:4d} connections: {summary['throughputPerSecond']:7.1f} req/s, "
+              f"p50 {summary['p50Ms']:7.1f} ms, p95 {summary['p95Ms']:7.1f} ms, "
+              f"errors {summary['errorRate']:.1%}, busy {summary['busyRate']:.1%}, failures {summary['failures']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import traceback
+
+import websockets
+
+from Protocol import COMMAND, END_OF_UTTERANCE, ERROR, RESULT, BUSY, AUDIO_CHUNK, AUDIO_UTTERANCE, encodeMessage
+
+
+class PipelinedRequests:
+    """
+    Enveloped requests for one connection. Every request runs as its own
+    task, so a client can send several commands or utterances without
+    waiting, and each answer is sent as soon as it is ready with the
+    request's id in replyTo. Audio sent in AUDIO_CHUNK envelopes is
+    buffered per request id until its END_OF_UTTERANCE arrives, up to
+    maxUtteranceBytes per utterance, maxBufferedBytes for the connection
+    and maxPendingUtterances ids at once; an utterance over a limit is
+    dropped and answered with ERROR, and its later chunks are ignored.
+    Requests the admission controller turns away are answered with BUSY;
+    chunked utterances are admitted when their first chunk arrives and
+    hold the slot while buffering. Audio is decoded from the connection's
+    negotiated format on the STT stage once it is complete.
+    """
+
+    def __init__(self, websocket, pipeline, file, admission, decoder,
+                 maxUtteranceBytes=4 * 1024 * 1024, maxBufferedBytes=8 * 1024 * 1024, maxPendingUtterances=8):
+        self.websocket = websocket
+        self.pipeline = pipeline
+        self.file = file
+        self.admission = admission
+        self.decoder = decoder
+        self.maxUtteranceBytes = maxUtteranceBytes
+        self.maxBufferedBytes = maxBufferedBytes
+        self.maxPendingUtterances = maxPendingUtterances
+        self.bufferedBytes = 0
+        # Every buffered utterance holds an admission slot
+        self.utterances = {}
+        # Ids whose buffer was dropped or never admitted, their remaining chunks are
+        # ignored until END_OF_UTTERANCE. Insertion ordered so the oldest can be forgotten
+        self.dropped = {}
+        self.tasks = set()
+
+    async def handleControl(self, control):
+        """Handle a COMMAND or END_OF_UTTERANCE message"""
+        requestId = control.get('id')
+        if control['type'] == COMMAND:
+            self._dispatch(requestId, control.get('text', ''))
+        elif control['type'] == END_OF_UTTERANCE:
+            if requestId in self.dropped:
+                # Already answered when its buffer was dropped
+                del self.dropped[requestId]
+                return
+            audio = self.utterances.pop(requestId, None)
+            if audio is None:
+                await self._send(encodeMessage(ERROR, replyTo=requestId, error="No audio received for this id"))
+            else:
+                self.bufferedBytes -= len(audio)
+                # Admitted with its first chunk, the slot passes on to the request
+                self._start(requestId, bytes(audio))
+
+    async def handleEnvelope(self, kind, requestId, payload):
+        """Handle a binary audio envelope"""
+        if kind == AUDIO_UTTERANCE:
+            self._dispatch(requestId, payload)
+        elif kind == AUDIO_CHUNK:
+            if requestId in self.dropped:
+                return
+            audio = self.utterances.get(requestId)
+            if audio is None:
+                if len(self.utterances) >= self.maxPendingUtterances:
+                    await self._reject(requestId, encodeMessage(
+                        ERROR, replyTo=requestId, error=f"More than {self.maxPendingUtterances} utterances buffered"))
+                    return
+                if not self.admission.tryAdmit(self.websocket):
+                    await self._reject(requestId, encodeMessage(BUSY, replyTo=requestId))
+                    return
+                audio = self.utterances[requestId] = bytearray()
+            if len(audio) + len(payload) > self.maxUtteranceBytes:
+                await self._drop(requestId, f"Utterance exceeds {self.maxUtteranceBytes} bytes")
+            elif self.bufferedBytes + len(payload) > self.maxBufferedBytes:
+                await self._drop(requestId, f"Connection buffers more than {self.maxBufferedBytes} bytes of audio")
+            else:
+                audio.extend(payload)
+                self.bufferedBytes += len(payload)
+
+    async def _drop(self, requestId, reason):
+        """Discard an utterance's buffered audio, free its slot and answer it with an error"""
+        audio = self.utterances.pop(requestId)
+        self.bufferedBytes -= len(audio)
+        self.admission.release(self.websocket)
+        await self._reject(requestId, encodeMessage(ERROR, replyTo=requestId, error=reason))
+
+    async def _reject(self, requestId, answer):
+        """Answer an utterance right away and ignore the rest of its audio"""
+        self.dropped[requestId] = None
+        if len(self.dropped) > self.maxPendingUtterances:
+            del self.dropped[next(iter(self.dropped))]
+        await self._send(answer)
+
+    def _dispatch(self, requestId, message):
+        if not self.admission.tryAdmit(self.websocket):
+            self._track(asyncio.get_running_loop().create_task(self._send(encodeMessage(BUSY, replyTo=requestId))))
+        else:
+            self._start(requestId, message)
+
+    def _start(self, requestId, message):
+        """Run an admitted request, its slot is released when the task finishes"""
+        task = asyncio.get_running_loop().create_task(self._run(requestId, message))
+        # A done callback also runs for tasks cancelled before they started
+        task.add_done_callback(lambda _: self.admission.release(self.websocket))
+        self._track(task)
+
+    def _track(self, task):
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, requestId, message):
+        try:
+            # Utterances are converted and decoded on the STT stage, so one connection's requests don't serialize
+            result = await self.pipeline.process(message, decoder=self.decoder)
+            await self._send(encodeMessage(RESULT, replyTo=requestId, result=result))
+        except Exception as e:
+            self.admission.recordFailure()
+            self.file.writeToFile(traceback.format_exc())
+            traceback.print_exc()
+            await self._send(encodeMessage(ERROR, replyTo=requestId, error=str(e)))
+
+    async def _send(self, message):
+        try:
+            await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def close(self):
+        """Cancel requests still running when the connection goes away"""
+        for task in list(self.tasks):
+            task.cancel()
+        for _ in self.utterances:
+            self.admission.release(self.websocket)
+        self.utterances.clear()
+        self.bufferedBytes = 0
+        self.dropped.clear()
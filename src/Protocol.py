@@ -0,0 +1,68 @@
+import json
+import struct
+
+# Control messages are small JSON objects sent as text frames. Anything else
+# that arrives as text is treated as a raw command for backward compatibility.
+STREAM_START = 'stream_start'
+STREAM_END = 'stream_end'
+PARTIAL = 'partial'
+RESULT = 'result'
+# Request and reply carrying latency histograms and server counters
+STATS = 'stats'
+# Sets the connection's audio format: {"sampleRate", "channels", "encoding"},
+# encoding one of pcm16, mulaw and alaw. Default is 16 kHz mono pcm16. The
+# server answers with the format now in effect, or an error.
+AUDIO_FORMAT = 'audio_format'
+
+# Enveloped requests carry an "id" the server echoes back as "replyTo", so a
+# client can have several in flight on one connection and match answers that
+# arrive out of order. COMMAND carries a text command, END_OF_UTTERANCE
+# finishes audio sent in AUDIO_CHUNK envelopes, ERROR answers a failed request.
+COMMAND = 'command'
+END_OF_UTTERANCE = 'end_of_utterance'
+ERROR = 'error'
+# Answer to a request turned away because the server's work queue or the
+# client's in-flight limit is full. Raw text and audio get BUSY_RESPONSE.
+BUSY = 'busy'
+BUSY_RESPONSE = "BUSY: Server is at capacity, try again shortly"
+
+# Binary envelopes: magic, kind, request id, then the raw 16-bit PCM payload.
+# The 4 byte magic keeps raw audio frames from being mistaken for envelopes.
+ENVELOPE_MAGIC = b'PAE1'
+ENVELOPE_HEADER = struct.Struct('>4sBI')
+AUDIO_CHUNK = 1
+AUDIO_UTTERANCE = 2
+
+
+def encodeMessage(messageType, **fields):
+    """Build a JSON control message"""
+    fields['type'] = messageType
+    return json.dumps(fields)
+
+
+def encodeEnvelope(kind, requestId, payload):
+    """Build a binary envelope around an audio payload"""
+    return ENVELOPE_HEADER.pack(ENVELOPE_MAGIC, kind, requestId) + payload
+
+
+def parseEnvelope(message):
+    """Return (kind, requestId, payload) for a binary envelope, or None for raw audio and text"""
+    if not isinstance(message, bytes) or not message.startswith(ENVELOPE_MAGIC) or len(message) < ENVELOPE_HEADER.size:
+        return None
+    _, kind, requestId = ENVELOPE_HEADER.unpack_from(message)
+    if kind not in (AUDIO_CHUNK, AUDIO_UTTERANCE):
+        return None
+    return kind, requestId, message[ENVELOPE_HEADER.size:]
+
+
+def parseControlMessage(message):
+    """Return the decoded control message, or None if message is a raw command or audio"""
+    if not isinstance(message, str) or not message.startswith('{'):
+        return None
+    try:
+        decoded = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(decoded, dict) or 'type' not in decoded:
+        return None
+    return decoded
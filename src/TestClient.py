@@ -1,25 +1,77 @@
 import asyncio
+import json
 import websockets
 from Utilities.AudioRecorder import AudioRecorder
+from Protocol import STREAM_START, STREAM_END, PARTIAL, RESULT, STATS, encodeMessage, parseControlMessage
+
+# Trim silence on the client so silent chunks are never sent
+CLIENT_VAD = True
+
+async def streamUtterance(websocket):
+    """Send audio chunks while they are captured and print transcripts as they come back"""
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    recorder = AudioRecorder(use_vad=CLIENT_VAD)
+    print("Press Enter to start streaming...")
+    await loop.run_in_executor(None, input)
+    await websocket.send(encodeMessage(STREAM_START))
+    recorder.start_recording(on_chunk=lambda data: loop.call_soon_threadsafe(chunks.put_nowait, data))
+    print("Streaming... Press Enter to stop.")
+
+    async def sendChunks():
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            await websocket.send(chunk)
+        await websocket.send(encodeMessage(STREAM_END))
+
+    async def stopOnEnter():
+        await loop.run_in_executor(None, input)
+        await loop.run_in_executor(None, recorder.stop_recording)
+        chunks.put_nowait(None)
+
+    sender = asyncio.create_task(sendChunks())
+    stopper = asyncio.create_task(stopOnEnter())
+    async for response in websocket:
+        control = parseControlMessage(response)
+        if control is None:
+            print(f"Received: {response}")
+        elif control['type'] == PARTIAL:
+            print(f"... {control['text']}")
+        elif control['type'] == RESULT:
+            print(f"Received: {control['result']} ('{control['text']}', {control['timeToCommandMs']:.0f} ms after speech)")
+        elif control['type'] == STREAM_END:
+            break
+    await asyncio.gather(sender, stopper)
+    recorder.cleanup()
 
 async def chat():
     async with websockets.connect('ws://localhost:12345') as websocket:
-        mode = input("Enter 'audio' or 'text'")
+        mode = input("Enter 'audio', 'stream', 'text' or 'stats'")
         while True:
             message = ""
+            if mode == 'stream':
+                await streamUtterance(websocket)
+                continue
+            if mode == 'stats':
+                input("Press Enter to fetch server stats...")
+                await websocket.send(encodeMessage(STATS))
+                print(json.dumps(parseControlMessage(await websocket.recv()), indent=2))
+                continue
             if mode == 'text':
                 message = input("Enter message: ")
             else:
-                recorder = AudioRecorder()
+                recorder = AudioRecorder(use_vad=CLIENT_VAD)
                 print("Press Enter to start recording...")
                 input()
                 recorder.start_recording()
                 print("Recording... Press Enter to stop and send.")
-                input()              
+                input()
                 message = recorder.stop_recording()
             await websocket.send(message)
             response = await websocket.recv()
             print(f"Received: {response}")
 
 if __name__ == "__main__":
-    asyncio.run(chat())
\ No newline at end of file
+    asyncio.run(chat())
@@ -39,10 +39,14 @@ class UserInterface:
         settingsFrame = ttk.Frame(self.notebook, padding="10")
         self.notebook.add(settingsFrame, text='Settings')
         
+        performanceFrame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(performanceFrame, text='Performance')
+        
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         
         self.setupApplicationsTable(settingsFrame)
+        self.setupPerformanceTable(performanceFrame)
     
     def setupApplicationsTable(self, parent):
         """Create a scrollable table showing all detected applications"""
@@ -85,15 +89,52 @@ class UserInterface:
         self.tableFrame = tableFrame
         
         self.populateApplications()
+        self.refreshApplications()
     
     def populateApplications(self):
         """Load applications from app_registry into the table"""
         for item in self.appTree.get_children():
             self.appTree.delete(item)
         
+        self.shownVersion = self.app_registry.version
         for index, (appName, appPath) in enumerate(self.app_registry.apps):
             rowNumber = index + 1
             self.appTree.insert('', tk.END, values=(rowNumber, appName, appPath))
+
+    def refreshApplications(self, intervalMs=2000):
+        """Repopulate the table when background discovery changed the registry"""
+        if self.app_registry.version != self.shownVersion:
+            self.populateApplications()
+        self.root.after(intervalMs, self.refreshApplications)
+    
+    def setupPerformanceTable(self, parent):
+        """Create a table of per-stage latency percentiles that refreshes itself"""
+        parent.columnconfigure(0, weight=1)
+        parent.rowconfigure(0, weight=1)
+        
+        columns = ('Stage', 'Count', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)')
+        self.latencyTree = ttk.Treeview(parent, columns=columns, show='headings', height=20)
+        for column in columns:
+            self.latencyTree.heading(column, text=column)
+            self.latencyTree.column(column, width=100, anchor=tk.E)
+        self.latencyTree.column('Stage', width=200, anchor=tk.W)
+        self.latencyTree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.refreshPerformance()
+    
+    def refreshPerformance(self, intervalMs=1000):
+        """Reload the latency table from the shared tracker every intervalMs"""
+        for item in self.latencyTree.get_children():
+            self.latencyTree.delete(item)
+        
+        stats = self.autocorrect.latencyTracker.getStats()
+        for stage in sorted(stats):
+            span = stats[stage]
+            self.latencyTree.insert('', tk.END, values=(
+                stage, span['count'],
+                f"{span['p50Ms']:.1f}", f"{span['p95Ms']:.1f}", f"{span['p99Ms']:.1f}", f"{span['maxMs']:.1f}"
+            ))
+        self.root.after(intervalMs, self.refreshPerformance)
     
     def onCellDoubleClick(self, event):
         """Handle double-click on a cell to edit it"""
@@ -131,7 +172,7 @@ class UserInterface:
             
             appIndex = rowNumber - 1
             
-            if appIndex < 0 or appIndex >= len(self.app_registry.apps):
+            if appIndex < 0:
                 return
             
             appsColIndex = colIndex - 2
@@ -173,10 +214,16 @@ class UserInterface:
                     newValues[colIndex - 1] = newValue
                     self.appTree.item(item, values=tuple(newValues))
                     
-                    if 0 <= appIndex < len(self.app_registry.apps):
-                        self.app_registry.apps[appIndex][appsColIndex] = newValue
-                        self.app_registry.saveApplicationsToFile()
-                        print(f"Updated appRegistry.apps[{appIndex}][{appsColIndex}] to: {newValue}")
+                    # The row shows the app as it was when the table was filled, discovery
+                    # may have moved it since, so the registry looks it up by those values
+                    shownApp = [str(currentValues[1]), str(currentValues[2])]
+                    updatedApp = list(shownApp)
+                    updatedApp[appsColIndex] = newValue
+                    if self.app_registry.updateApplication(appIndex, updatedApp[0], updatedApp[1], previous=shownApp):
+                        print(f"Updated {shownApp[0]} {columnName.lower()} to: {newValue}")
+                    else:
+                        print(f"{shownApp[0]} was removed before the edit was saved")
+                        self.populateApplications()
                 except Exception as e:
                     print(f"Error saving edit: {e}")
                     import traceback
@@ -234,11 +281,8 @@ class UserInterface:
             if not appName or not appPath:
                 return
             
-            # Add to appRegistry
-            self.app_registry.apps.append([appName, appPath])
-            
-            # Save to cache
-            self.app_registry.saveApplicationsToFile()
+            # Add to appRegistry and save to cache
+            self.app_registry.addApplication(appName, appPath)
             
             # Refresh the table
             self.populateApplications()
@@ -0,0 +1,61 @@
+class AdmissionController:
+    """
+    Bounds how much work clients can queue against the pipeline. At most
+    maxQueued requests are admitted server wide and at most
+    maxInFlightPerClient per connection; a request over either limit is
+    turned away immediately with a busy answer instead of waiting, so a
+    burst costs rejections rather than unbounded latency.
+
+    Only used from the event loop, so the counters need no lock.
+    """
+
+    def __init__(self, maxQueued=32, maxInFlightPerClient=4):
+        self.maxQueued = maxQueued
+        self.maxInFlightPerClient = maxInFlightPerClient
+        self.queued = 0
+        self.peakQueued = 0
+        self.inFlight = {}
+        self.admitted = 0
+        self.rejectedQueueFull = 0
+        self.rejectedClientLimit = 0
+        self.failed = 0
+
+    def tryAdmit(self, client):
+        """Reserve a slot for one request from client, returns False if the server is busy"""
+        if self.queued >= self.maxQueued:
+            self.rejectedQueueFull += 1
+            return False
+        clientInFlight = self.inFlight.get(client, 0)
+        if clientInFlight >= self.maxInFlightPerClient:
+            self.rejectedClientLimit += 1
+            return False
+        self.inFlight[client] = clientInFlight + 1
+        self.queued += 1
+        self.peakQueued = max(self.peakQueued, self.queued)
+        self.admitted += 1
+        return True
+
+    def release(self, client):
+        """Free the slot of a finished request"""
+        self.queued -= 1
+        remaining = self.inFlight[client] - 1
+        if remaining:
+            self.inFlight[client] = remaining
+        else:
+            del self.inFlight[client]
+
+    def recordFailure(self):
+        """Count a request that raised instead of producing a result"""
+        self.failed += 1
+
+    def getStats(self):
+        return {
+            "queued": self.queued,
+            "peakQueued": self.peakQueued,
+            "maxQueued": self.maxQueued,
+            "maxInFlightPerClient": self.maxInFlightPerClient,
+            "admitted": self.admitted,
+            "rejectedQueueFull": self.rejectedQueueFull,
+            "rejectedClientLimit": self.rejectedClientLimit,
+            "failed": self.failed
+        }
@@ -0,0 +1,288 @@
+import itertools
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+
+def parseApplicationList(lines):
+    """
+    Yield [name, path] pairs from PowerShell Format-List output, reading it
+    one line at a time. Entries are "DisplayName : App" and
+    "Executable : C:\\Path\\App.exe" blocks separated by empty lines.
+    """
+    current = {}
+    # A trailing empty line finishes the last entry
+    for line in itertools.chain(lines, ['']):
+        line = line.strip()
+        propertyName, value = line.split(' : ', 1) if ' : ' in line else ('', '')
+        propertyName = propertyName.strip()
+        # A repeated property also starts a new entry, in case a separator line is missing
+        if not line or propertyName in current:
+            if 'DisplayName' in current and 'Executable' in current:
+                yield [current['DisplayName'], current['Executable'].strip('"')]
+            current = {}
+        if propertyName:
+            current[propertyName] = value.strip()
+
+
+# Exec arguments with field codes stand for files, URLs and icons passed at launch time
+EXEC_FIELD_CODES = re.compile(r'\s*[^\s%]*%[fFuUdDnNickvm]\S*')
+
+
+def parseDesktopEntry(lines):
+    """Return [name, command] for a launchable graphical XDG .desktop entry, or None"""
+    fields = {}
+    inEntry = False
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            if inEntry:
+                break
+            inEntry = line == '[Desktop Entry]'
+        elif inEntry and '=' in line and not line.startswith('#'):
+            key, value = line.split('=', 1)
+            fields.setdefault(key.strip(), value.strip())
+    if fields.get('Type') != 'Application' or 'Name' not in fields or 'Exec' not in fields:
+        return None
+    if fields.get('NoDisplay') == 'true' or fields.get('Hidden') == 'true':
+        return None
+    # Command line tools that only make sense inside a terminal aren't voice launchable applications
+    if fields.get('Terminal') == 'true':
+        return None
+    command = EXEC_FIELD_CODES.sub('', fields['Exec']).replace('%%', '%').strip()
+    return [fields['Name'], command]
+
+
+class DiscoveryBackend:
+    """
+    One way of finding installed applications, split into sources that are
+    fingerprinted and rescanned independently
+    """
+
+    name = 'none'
+
+    def isSupported(self):
+        return False
+
+    def listSources(self):
+        """Every source applications are currently discovered from"""
+        return []
+
+    def fingerprint(self, source):
+        """Changes whenever the source may have changed, None if it is gone"""
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def scan(self, source):
+        """Every [name, path] found in source"""
+        return []
+
+
+class WindowsDiscovery(DiscoveryBackend):
+    """
+    Installed programs from the registry uninstall keys, resolved to
+    executables by DetectApplications.ps1. The script only runs when one
+    of the keys was written since the last scan.
+    """
+
+    name = 'windows'
+    UNINSTALL_KEYS = (
+        r"Software\Microsoft\Windows\CurrentVersion\Uninstall",
+        r"Software\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+    )
+
+    def __init__(self, scriptPath=None):
+        if scriptPath is None:
+            currentDirectory = os.path.dirname(os.path.abspath(__file__))
+            scriptPath = os.path.join(currentDirectory, "..", "Scripts", "DetectApplications.ps1")
+        self.scriptPath = os.path.abspath(scriptPath)
+
+    def isSupported(self):
+        return sys.platform == 'win32'
+
+    def listSources(self):
+        return ['uninstall']
+
+    def fingerprint(self, source):
+        import winreg
+        fingerprint = []
+        for keyPath in self.UNINSTALL_KEYS:
+            try:
+                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, keyPath) as key:
+                    subkeys, _, lastWrite = winreg.QueryInfoKey(key)
+                fingerprint += [lastWrite, subkeys]
+            except OSError:
+                fingerprint += [None, 0]
+        return fingerprint
+
+    def scan(self, source):
+        print("detecting applications")
+        process = subprocess.Popen(["powershell.exe", self.scriptPath], stdout=subprocess.PIPE,
+                                   text=True, encoding='utf-8', errors='replace')
+        with process.stdout:
+            apps = list(parseApplicationList(process.stdout))
+        if process.wait() != 0:
+            raise RuntimeError(f"DetectApplications.ps1 exited with code {process.returncode}")
+        return apps
+
+
+class LinuxDiscovery(DiscoveryBackend):
+    """
+    XDG .desktop entries, each file its own source. scanPath also adds the
+    executables of every $PATH directory, each directory its own source;
+    it is off by default because $PATH holds thousands of command line
+    tools that crowd out the real applications in every lookup. Files
+    reached through symlinked directories are only listed once.
+    """
+
+    name = 'linux'
+
+    def __init__(self, scanPath=False):
+        self.scanPath = scanPath
+
+    def isSupported(self):
+        return sys.platform.startswith('linux')
+
+    def applicationDirectories(self):
+        dataHome = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        dataDirs = os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share'
+        directories = [dataHome] + [directory for directory in dataDirs.split(':') if directory]
+        return [os.path.join(directory, 'applications') for directory in directories]
+
+    def listSources(self):
+        sources = []
+        seen = set()
+        for directory in self.applicationDirectories():
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    path = os.path.join(root, file)
+                    if file.endswith('.desktop') and os.path.realpath(path) not in seen:
+                        seen.add(os.path.realpath(path))
+                        sources.append(path)
+        if self.scanPath:
+            for directory in os.environ.get('PATH', '').split(os.pathsep):
+                # /bin is often a symlink to /usr/bin
+                if directory and os.path.isdir(directory) and os.path.realpath(directory) not in seen:
+                    seen.add(os.path.realpath(directory))
+                    sources.append(directory)
+        return sources
+
+    def scan(self, source):
+        if source.endswith('.desktop'):
+            with open(source, 'r', encoding='utf-8', errors='replace') as file:
+                entry = parseDesktopEntry(file)
+            return [entry] if entry else []
+        apps = []
+        with os.scandir(source) as entries:
+            for entry in entries:
+                if entry.is_file() and os.access(entry.path, os.X_OK):
+                    # Resolved, so links to one executable from several directories merge into one application
+                    apps.append([entry.name, os.path.realpath(entry.path)])
+        return apps
+
+
+class ApplicationDiscovery:
+    """
+    Keeps the registry in step with what is installed. Every refresh
+    fingerprints each source of the supported backends, rescans only the
+    sources whose fingerprint changed, and merges the difference into the
+    registry. Runs on a background thread, at start and then every
+    interval seconds, so startup never waits for a scan.
+    """
+
+    def __init__(self, registry, store, backends=None, interval=600):
+        self.registry = registry
+        self.store = store
+        if backends is None:
+            backends = [WindowsDiscovery(), LinuxDiscovery()]
+        self.backends = [backend for backend in backends if backend.isSupported()]
+        self.interval = interval
+        self.thread = None
+        self.stopped = threading.Event()
+
+        self.refreshes = 0
+        self.sourcesScanned = 0
+        self.sourcesUnchanged = 0
+        self.lastRefreshSeconds = 0.0
+
+    def start(self):
+        if self.thread is None and self.backends:
+            self.thread = threading.Thread(target=self._run, name='app-discovery', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Application discovery failed: {e}")
+            if not self.interval or self.stopped.wait(self.interval):
+                return
+
+    def refresh(self):
+        """Rescan the sources whose fingerprint changed and merge the differences into the registry"""
+        start = time.perf_counter()
+        for backend in self.backends:
+            stored = self.store.loadSources(backend.name)
+            known = dict(stored)
+            added, removed = [], []
+            changed = {}
+            for source in backend.listSources():
+                fingerprint = backend.fingerprint(source)
+                if fingerprint is None:
+                    continue
+                previous = known.pop(source, None)
+                if previous is not None and previous[0] == fingerprint:
+                    self.sourcesUnchanged += 1
+                    continue
+                try:
+                    apps = backend.scan(source)
+                except Exception as e:
+                    print(f"Could not scan {source}: {e}")
+                    continue
+                self.sourcesScanned += 1
+                oldApps = {tuple(app) for app in previous[1]} if previous else set()
+                newApps = {tuple(app) for app in apps}
+                added += [list(app) for app in newApps - oldApps]
+                removed += [list(app) for app in oldApps - newApps]
+                changed[source] = (fingerprint, apps)
+            # Sources that disappeared take their applications with them
+            for _, oldApps in known.values():
+                removed += oldApps
+            if removed:
+                # An application stays while any other source still provides it,
+                # such as the system copy of a user's overridden .desktop file
+                current = {source: apps for source, (_, apps) in stored.items() if source not in known}
+                current.update((source, apps) for source, (_, apps) in changed.items())
+                provided = self._providedBy(current.values())
+                for other in self.backends:
+                    if other is not backend:
+                        provided |= self._providedBy(apps for _, apps in self.store.loadSources(other.name).values())
+                removed = [app for app in removed if (app[0].casefold(), app[1]) not in provided]
+
+            # Merged first, so a crash in between rescans rather than loses applications
+            self.registry.mergeDiscovered(added, removed)
+            self.store.saveSources(backend.name, changed, list(known))
+        self.refreshes += 1
+        self.lastRefreshSeconds = time.perf_counter() - start
+
+    def _providedBy(self, appLists):
+        return {(name.casefold(), path) for apps in appLists for name, path in apps}
+
+    def getStats(self):
+        return {
+            "backends": [backend.name for backend in self.backends],
+            "refreshes": self.refreshes,
+            "sourcesScanned": self.sourcesScanned,
+            "sourcesUnchanged": self.sourcesUnchanged,
+            "lastRefreshSeconds": self.lastRefreshSeconds
+        }
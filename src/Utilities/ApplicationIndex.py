@@ -0,0 +1,153 @@
+import re
+import threading
+from collections import defaultdict
+
+SOUNDEX_CODES = {}
+for letters, code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6')):
+    for letter in letters:
+        SOUNDEX_CODES[letter] = code
+
+
+def normalizeName(text):
+    """Lowercase text and reduce it to space separated alphanumeric tokens"""
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def characterGrams(normalized, size=3):
+    """Character n-grams of a normalized name, padded so word boundaries count"""
+    padded = f" {normalized} "
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def phoneticKey(token):
+    """
+    Untruncated Soundex code of a token. Spelling variants that sound the
+    same, like "undrtail" and "undertale", share a key.
+    """
+    letters = [c for c in token if c.isalpha()]
+    if not letters:
+        return token
+    key = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        code = SOUNDEX_CODES.get(letter, '')
+        if code and code != previous:
+            key += code
+        # 'h' and 'w' don't separate repeated codes, vowels do
+        if letter not in 'hw':
+            previous = code
+    return key
+
+
+class IndexedApplication:
+    __slots__ = ('app', 'normalized', 'tokens', 'grams', 'phonetics')
+
+    def __init__(self, app):
+        self.app = app
+        self.normalized = normalizeName(app[0])
+        self.tokens = self.normalized.split()
+        self.grams = characterGrams(self.normalized)
+        self.phonetics = {phoneticKey(token) for token in self.tokens}
+
+
+class ApplicationIndex:
+    """
+    Search index over application names. Names are normalized once, and
+    lookups only score applications that share a character trigram or a
+    phonetic key with the query, so cost grows with the number of plausible
+    matches rather than with the number of installed applications.
+    """
+
+    def __init__(self, apps=None):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.entryIds = defaultdict(list)
+        self.gramPostings = defaultdict(set)
+        self.phoneticPostings = defaultdict(set)
+        self.nextId = 0
+        for app in apps or []:
+            self.add(app[0], app[1])
+
+    def add(self, name, path):
+        with self.lock:
+            entryId = self.nextId
+            self.nextId += 1
+            entry = IndexedApplication([name, path])
+            self.entries[entryId] = entry
+            self.entryIds[(name, path)].append(entryId)
+            for gram in entry.grams:
+                self.gramPostings[gram].add(entryId)
+            for key in entry.phonetics:
+                self.phoneticPostings[key].add(entryId)
+
+    def remove(self, name, path):
+        with self.lock:
+            ids = self.entryIds.get((name, path))
+            if not ids:
+                return
+            entryId = ids.pop()
+            if not ids:
+                del self.entryIds[(name, path)]
+            entry = self.entries.pop(entryId)
+            for gram in entry.grams:
+                self._discard(self.gramPostings, gram, entryId)
+            for key in entry.phonetics:
+                self._discard(self.phoneticPostings, key, entryId)
+
+    def _discard(self, postings, key, entryId):
+        posting = postings.get(key)
+        if posting is not None:
+            posting.discard(entryId)
+            if not posting:
+                del postings[key]
+
+    def onApplicationsChanged(self, added, removed):
+        """ApplicationRegistry listener that applies only the changed entries"""
+        for name, path in removed:
+            self.remove(name, path)
+        for name, path in added:
+            self.add(name, path)
+
+    def search(self, query, limit=5, minScore=0.3):
+        """
+        Return up to limit (score, [name, path]) candidates for query, best
+        first. Scores are in [0, 1]; 1.0 means the application name appears
+        in the query word for word.
+        """
+        normalized = normalizeName(query)
+        if not normalized:
+            return []
+        queryGrams = characterGrams(normalized)
+        queryTokens = normalized.split()
+        queryPhonetics = {phoneticKey(token) for token in queryTokens}
+        paddedQuery = f" {normalized} "
+
+        with self.lock:
+            sharedGrams = defaultdict(int)
+            for gram in queryGrams:
+                for entryId in self.gramPostings.get(gram, ()):
+                    sharedGrams[entryId] += 1
+            candidates = set(sharedGrams)
+            for key in queryPhonetics:
+                candidates.update(self.phoneticPostings.get(key, ()))
+
+            results = []
+            for entryId in candidates:
+                entry = self.entries[entryId]
+                score = self._score(entry, sharedGrams.get(entryId, 0), queryGrams, queryPhonetics, paddedQuery)
+                if score >= minScore:
+                    results.append((score, entryId, entry.app))
+
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return [(score, app) for score, _, app in results[:limit]]
+
+    def _score(self, entry, shared, queryGrams, queryPhonetics, paddedQuery):
+        if f" {entry.normalized} " in paddedQuery:
+            return 1.0
+        dice = 2 * shared / (len(entry.grams) + len(queryGrams))
+        coverage = shared / len(entry.grams)
+        score = 0.5 * dice + 0.5 * coverage
+        # Every word of the name sounds like a word of the query
+        if entry.phonetics and entry.phonetics <= queryPhonetics:
+            score = 0.5 + 0.75 * score
+        return min(score, 0.99)
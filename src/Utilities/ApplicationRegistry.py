@@ -1,93 +1,162 @@
-import subprocess
+import hashlib
+import io
 import os
 import json
+import threading
+from Utilities.ApplicationDiscovery import ApplicationDiscovery, parseApplicationList
+from Utilities.ApplicationIndex import ApplicationIndex
+from Utilities.ApplicationStore import ApplicationStore
 
 
 class ApplicationRegistry:
-    def __init__(self):
+    def __init__(self, cacheFilePath=None, databasePath=None):
         self.apps = []
+        # Whether discovery added each app, only those rows are ever removed by it
+        self.discovered = []
+        self.listeners = []
+        # Edits come from the UI thread and merges from background discovery
+        self.lock = threading.RLock()
+        self.discovery = None
         currentDirectory = os.path.dirname(os.path.abspath(__file__))
-        self.cacheFilePath = os.path.join(currentDirectory, "..", "applications_cache.json")
-        self.cacheFilePath = os.path.abspath(self.cacheFilePath)
+        if cacheFilePath is None:
+            cacheFilePath = os.path.join(currentDirectory, "..", "applications_cache.json")
+            if databasePath is None:
+                databasePath = os.path.join(currentDirectory, "..", "applications.db")
+        # The JSON cache is only read to seed an empty database. An explicit cache
+        # file without a database is loaded into an in-memory store and never written
+        self.cacheFilePath = os.path.abspath(cacheFilePath)
+        self.store = ApplicationStore(os.path.abspath(databasePath) if databasePath else ':memory:')
         self.detectInstalledApplications()
+        # Changes whenever the apps change, stable across restarts
+        self.version = self.store.version()
+
+        # Fuzzy and phonetic name lookup, kept in sync with every change
+        self.index = ApplicationIndex(self.apps)
+        self.addListener(self.index.onApplicationsChanged)
 
     def detectInstalledApplications(self):
-        if os.path.exists(self.cacheFilePath):
+        self.apps = self.store.loadAll()
+        self.discovered = self.store.loadDiscovered()
+        if self.apps:
+            print(f"Loaded {len(self.apps)} applications from database")
+        elif os.path.exists(self.cacheFilePath):
             self.loadApplicationsFromFile(self.cacheFilePath)
         else:
-            self.runPowerShellDetection()
+            print("No stored applications yet, discovery will add them")
     
     def loadApplicationsFromFile(self, filePath):
-        """Load applications from cached JSON file"""
+        """Import applications from a JSON cache file into the store"""
         try:
-            with open(filePath, 'r', encoding='utf-8') as f:
-                self.apps = json.load(f)
-            print(f"Loaded {len(self.apps)} applications from cache")
+            with open(filePath, 'rb') as f:
+                content = f.read()
+            self.apps = [[name, path] for name, path in json.loads(content.decode('utf-8'))]
+            self.discovered = [False] * len(self.apps)
+            self.store.replaceAll(self.apps)
+            if self.store.databasePath == ':memory:':
+                # The same file gives the same version every run, so versioned caches stay valid
+                self.store.setStoreId(hashlib.sha256(content).hexdigest()[:8])
+            print(f"Imported {len(self.apps)} applications from {filePath}")
         except Exception as e:
             print(f"Error loading applications from cache: {e}")
-            print("Falling back to PowerShell detection...")
-            self.runPowerShellDetection()
-    
-    def saveApplicationsToFile(self, filePath=None):
-        """Save applications to JSON cache file"""
-        if filePath is None:
-            filePath = self.cacheFilePath
-        try:
-            with open(filePath, 'w', encoding='utf-8') as f:
-                json.dump(self.apps, f, indent=2, ensure_ascii=False)
-            print(f"Saved {len(self.apps)} applications to cache")
-        except Exception as e:
-            print(f"Error saving applications to cache: {e}")
-    
-    def runPowerShellDetection(self):
-        """Run PowerShell script to detect applications and save to cache"""
-        currentDirectory = os.path.dirname(os.path.abspath(__file__))
-        scriptPath = os.path.join(
-            currentDirectory, "..", "Scripts", "DetectApplications.ps1"
-        )
-        scriptPath = os.path.abspath(scriptPath)
-        print("detecting applications")
-        response = subprocess.run(
-            ["powershell.exe", scriptPath], capture_output=True, text=True
-        )
-        if response:
-            self.recordInstalledApplications(response.stdout)
-            self.saveApplicationsToFile()
-        else:
-            print("failed to detect installed applications..?")
+            print("Discovery will add the applications instead")
+
+    def startDiscovery(self, interval=600):
+        """Discover installed applications in the background, now and every interval seconds"""
+        if self.discovery is None:
+            self.discovery = ApplicationDiscovery(self, self.store, interval=interval)
+            self.discovery.start()
+        return self.discovery
+
+    def findApplication(self, name):
+        """Look up an application by exact name, ignoring case, without scanning the list"""
+        return self.store.findByName(name)
+
+    def addListener(self, listener):
+        """Call listener(added, removed) with lists of [name, path] whenever apps change"""
+        self.listeners.append(listener)
+
+    def notifyListeners(self, added, removed):
+        for listener in self.listeners:
+            listener(added, removed)
+
+    def addApplication(self, name, path):
+        """Add an application, store its row and notify listeners"""
+        app = [name, path]
+        with self.lock:
+            self.apps.append(app)
+            self.discovered.append(False)
+            self.store.put(len(self.apps) - 1, name, path)
+            self.version = self.store.version()
+        self.notifyListeners([app], [])
+
+    def updateApplication(self, index, name, path, previous=None):
+        """
+        Replace the application at index, store its row and notify listeners.
+        Discovery may have moved applications since index was read, so when
+        previous [name, path] is given the application equal to it is
+        replaced instead, wherever it is now. Returns False if it is gone.
+        An edited application belongs to the user, discovery won't remove it.
+        """
+        with self.lock:
+            if previous is not None:
+                index = self._locate(index, list(previous))
+                if index is None:
+                    return False
+            previous = list(self.apps[index])
+            self.apps[index] = [name, path]
+            self.discovered[index] = False
+            self.store.put(index, name, path)
+            self.version = self.store.version()
+            updated = self.apps[index]
+        self.notifyListeners([updated], [previous])
+        return True
+
+    def _locate(self, index, app):
+        if 0 <= index < len(self.apps) and self.apps[index] == app:
+            return index
+        return next((position for position, listed in enumerate(self.apps) if listed == app), None)
+
+    def mergeDiscovered(self, added, removed):
+        """
+        Apply a discovery diff: drop removed applications that discovery
+        added, append added ones that aren't listed yet, then notify
+        listeners once. Applications the user added, edited or imported
+        are never dropped. Appends write only the new rows; removals shift
+        positions, so the store is rewritten in one transaction.
+        """
+        with self.lock:
+            removedKeys = {(name.casefold(), path) for name, path in removed}
+            kept, keptDiscovered, dropped = [], [], []
+            for app, discovered in zip(self.apps, self.discovered):
+                if discovered and (app[0].casefold(), app[1]) in removedKeys:
+                    dropped.append(app)
+                else:
+                    kept.append(app)
+                    keptDiscovered.append(discovered)
+            listed = {(name.casefold(), path) for name, path in kept}
+            new = []
+            for name, path in added:
+                if (name.casefold(), path) not in listed:
+                    listed.add((name.casefold(), path))
+                    new.append([name, path])
+            if not new and not dropped:
+                return
+            if dropped:
+                self.apps[:] = kept + new
+                self.discovered[:] = keptDiscovered + [True] * len(new)
+                self.store.replaceAll(self.apps, self.discovered)
+            else:
+                self.store.append(len(self.apps), new, discovered=True)
+                self.apps.extend(new)
+                self.discovered.extend([True] * len(new))
+            self.version = self.store.version()
+        print(f"Discovery added {len(new)} and removed {len(dropped)} applications")
+        self.notifyListeners(new, dropped)
 
     def recordInstalledApplications(self, powershellResponse):
-        print('recording installed apps')
-        lines = powershellResponse.strip().split("\n")
-        
-        # Parse list format: "Property : Value" with empty lines between entries
-        # Format: DisplayName : App Name
-        #         Executable  : C:\Path\To\App.exe
-        current_app = {}
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines - they separate app entries
-            if not line:
-                # Empty line means we should finalize current app if we have both properties
-                if current_app and 'DisplayName' in current_app and 'Executable' in current_app:
-                    # Remove quotes from path if present
-                    path = current_app['Executable'].strip('"')
-                    self.apps.append([current_app['DisplayName'], path])
-                current_app = {}
-                continue
-            
-            # Parse "Property : Value" format
-            if ' : ' in line:
-                parts = line.split(' : ', 1)
-                if len(parts) == 2:
-                    prop_name = parts[0].strip()
-                    prop_value = parts[1].strip()
-                    current_app[prop_name] = prop_value
-        
-        # Handle last app if no trailing empty line
-        if current_app and 'DisplayName' in current_app and 'Executable' in current_app:
-            path = current_app['Executable'].strip('"')
-            self.apps.append([current_app['DisplayName'], path])
-        print(self.apps)
-        print(f"Loaded {len(self.apps)} applications")
\ No newline at end of file
+        """Append the applications in DetectApplications.ps1 output, a string or an iterable of lines"""
+        if isinstance(powershellResponse, str):
+            powershellResponse = io.StringIO(powershellResponse)
+        found = list(parseApplicationList(powershellResponse))
+        self.mergeDiscovered(found, [])
+        print(f"Recorded {len(found)} installed applications")
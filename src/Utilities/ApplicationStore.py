@@ -0,0 +1,175 @@
+import json
+import sqlite3
+import threading
+import uuid
+
+
+class ApplicationStore:
+    """
+    SQLite storage for the application registry. Every application is one
+    row keyed by its position in the registry, so adding or editing an
+    application writes a single row instead of the whole list, and name
+    lookups go through an index instead of a scan. The database runs in
+    WAL mode, so each change is an append to the journal that SQLite
+    checkpoints on its own.
+
+    The revision is bumped in the same transaction as every change and,
+    together with a random id fixed when the database is created, forms
+    a version that survives restarts. An in-memory store has nothing to
+    keep its id in, so its owner sets one with setStoreId.
+
+    Discovery keeps each source's fingerprint and the applications last
+    found in it in the sources table, and marks the rows it added so it
+    never removes one the user added, edited or imported.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS applications (
+            position INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            path TEXT NOT NULL,
+            nameKey TEXT NOT NULL,
+            discovered INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS applicationsByName ON applications (nameKey);
+        CREATE TABLE IF NOT EXISTS sources (
+            backend TEXT NOT NULL,
+            source TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            apps TEXT NOT NULL,
+            PRIMARY KEY (backend, source)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, databasePath=':memory:'):
+        self.databasePath = databasePath
+        self.lock = threading.Lock()
+        # Written from the UI thread and background discovery, reads and writes are serialized by lock
+        self.connection = sqlite3.connect(databasePath, check_same_thread=False)
+        if databasePath != ':memory:':
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.connection:
+            self.connection.executescript(self.SCHEMA)
+            self._addDiscoveredColumn()
+            self.connection.execute("INSERT OR IGNORE INTO meta VALUES ('storeId', ?)", (uuid.uuid4().hex[:8],))
+            self.connection.execute("INSERT OR IGNORE INTO meta VALUES ('revision', '0')")
+
+    def _addDiscoveredColumn(self):
+        """Databases created before rows were marked get the column, with rows some source provides marked"""
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(applications)")]
+        if 'discovered' in columns:
+            return
+        self.connection.execute("ALTER TABLE applications ADD COLUMN discovered INTEGER NOT NULL DEFAULT 0")
+        provided = set()
+        for (apps,) in self.connection.execute("SELECT apps FROM sources"):
+            provided.update((name.casefold(), path) for name, path in json.loads(apps))
+        rows = self.connection.execute("SELECT position, name, path FROM applications").fetchall()
+        self.connection.executemany(
+            "UPDATE applications SET discovered = 1 WHERE position = ?",
+            ((position,) for position, name, path in rows if (name.casefold(), path) in provided)
+        )
+
+    def nameKey(self, name):
+        return name.casefold().strip()
+
+    def loadAll(self):
+        """Every application as [name, path], in registry order"""
+        with self.lock:
+            rows = self.connection.execute("SELECT name, path FROM applications ORDER BY position").fetchall()
+        return [[name, path] for name, path in rows]
+
+    def loadDiscovered(self):
+        """Whether discovery added each application, in registry order"""
+        with self.lock:
+            rows = self.connection.execute("SELECT discovered FROM applications ORDER BY position").fetchall()
+        return [bool(discovered) for discovered, in rows]
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+
+    def findByName(self, name):
+        """The first application called name, ignoring case, as [name, path], or None"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT name, path FROM applications WHERE nameKey = ? ORDER BY position LIMIT 1",
+                (self.nameKey(name),)
+            ).fetchone()
+        return list(row) if row else None
+
+    def put(self, position, name, path):
+        """Insert or replace the application at position, as one the user owns"""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO applications VALUES (?, ?, ?, ?, 0)",
+                (position, name, path, self.nameKey(name))
+            )
+            self._bumpRevision()
+
+    def append(self, startPosition, apps, discovered=False):
+        """Insert apps at consecutive positions from startPosition in one transaction"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO applications VALUES (?, ?, ?, ?, ?)",
+                ((startPosition + offset, name, path, self.nameKey(name), discovered)
+                 for offset, (name, path) in enumerate(apps))
+            )
+            self._bumpRevision()
+
+    def replaceAll(self, apps, discovered=None):
+        """
+        Replace every application in one transaction, used by detection and
+        migration. discovered flags each application, by default none are
+        """
+        if discovered is None:
+            discovered = [False] * len(apps)
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM applications")
+            self.connection.executemany(
+                "INSERT INTO applications VALUES (?, ?, ?, ?, ?)",
+                ((position, name, path, self.nameKey(name), flag)
+                 for position, ((name, path), flag) in enumerate(zip(apps, discovered)))
+            )
+            self._bumpRevision()
+
+    def loadSources(self, backend):
+        """{source: (fingerprint, apps)} as last saved for backend"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT source, fingerprint, apps FROM sources WHERE backend = ?", (backend,)
+            ).fetchall()
+        return {source: (json.loads(fingerprint), json.loads(apps)) for source, fingerprint, apps in rows}
+
+    def saveSources(self, backend, changed, gone):
+        """Store the fingerprints and applications of changed sources and forget the gone ones"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                ((backend, source, json.dumps(fingerprint), json.dumps(apps, ensure_ascii=False))
+                 for source, (fingerprint, apps) in changed.items())
+            )
+            self.connection.executemany(
+                "DELETE FROM sources WHERE backend = ? AND source = ?", ((backend, source) for source in gone)
+            )
+
+    def setStoreId(self, storeId):
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE meta SET value = ? WHERE key = 'storeId'", (storeId,))
+
+    def _bumpRevision(self):
+        self.connection.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+
+    def version(self):
+        """Changes with every write, stable across restarts"""
+        with self.lock:
+            values = dict(self.connection.execute("SELECT key, value FROM meta").fetchall())
+        return f"{values['storeId']}-{values['revision']}"
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,163 @@
+import numpy as np
+
+PCM16 = 'pcm16'
+MULAW = 'mulaw'
+ALAW = 'alaw'
+ENCODINGS = (PCM16, MULAW, ALAW)
+
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+MAX_CHANNELS = 8
+
+
+def _mulawTable():
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (code >> 4) & 0x07
+    mantissa = code & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _alawTable():
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (code >> 4) & 0x07
+    mantissa = code & 0x0F
+    magnitude = np.where(exponent == 0, (mantissa << 4) + 8,
+                         ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0))
+    return np.where(code & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+# G.711 bytes decode by indexing these 256 entry tables with the whole buffer at once
+DECODE_TABLES = {MULAW: _mulawTable(), ALAW: _alawTable()}
+
+
+def encodeG711(pcm, encoding):
+    """Encode 16-bit PCM as μ-law or A-law bytes, each sample becomes the code of its nearest level"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    table = DECODE_TABLES[encoding]
+    order = np.argsort(table, kind='stable')
+    levels = table[order].astype(np.int32)
+    upper = np.clip(np.searchsorted(levels, samples), 1, len(levels) - 1)
+    lower = upper - 1
+    nearest = np.where(samples - levels[lower] <= levels[upper] - samples, lower, upper)
+    return order[nearest].astype(np.uint8).tobytes()
+
+
+def lowPassFilter(cutoff, taps):
+    """Hann windowed sinc low-pass, cutoff as a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming sample rate conversion of mono float samples. Downsampling
+    low-passes below the new Nyquist frequency first, then output samples
+    are linearly interpolated at fractional input positions. The filter
+    history and the fractional position carry over between chunks, so a
+    stream resamples the same as one buffer would.
+    """
+
+    def __init__(self, sourceRate, targetRate=16000, taps=31):
+        self.step = sourceRate / targetRate
+        if sourceRate > targetRate:
+            # Slightly under the target Nyquist frequency so the transition band doesn't alias
+            self.kernel = lowPassFilter(0.45 * targetRate / sourceRate, taps)
+        else:
+            self.kernel = np.ones(1, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(len(self.kernel) - 1, dtype=np.float32)
+        self.lastSample = np.float32(0.0)
+        # Position of the next output sample, counted from the previous chunk's last sample
+        self.position = 1.0
+
+    def process(self, samples):
+        if len(samples) == 0:
+            return samples
+        padded = np.concatenate((self.history, samples))
+        filtered = np.convolve(padded, self.kernel, mode='valid')
+        if len(self.history):
+            self.history = padded[-len(self.history):]
+        points = np.concatenate(([self.lastSample], filtered))
+        positions = np.arange(self.position, len(points) - 1, self.step)
+        index = positions.astype(np.int64)
+        fraction = (positions - index).astype(np.float32)
+        output = points[index] * (1 - fraction) + points[index + 1] * fraction
+        nextPosition = positions[-1] + self.step if len(positions) else self.position
+        self.position = nextPosition - (len(points) - 1)
+        self.lastSample = points[-1]
+        return output
+
+
+class AudioDecoder:
+    """
+    Turns a connection's negotiated audio format into the 16 kHz mono
+    16-bit PCM Vosk and the voice activity detector expect. The default
+    format is exactly that and passes through untouched.
+    """
+
+    def __init__(self, targetRate=16000):
+        self.targetRate = targetRate
+        self.bytesIn = 0
+        self.bytesOut = 0
+        self.configure(targetRate, 1, PCM16)
+
+    def configure(self, sampleRate, channels, encoding):
+        """Switch to a new client format, raises ValueError if it isn't supported"""
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported audio encoding '{encoding}', expected one of {', '.join(ENCODINGS)}")
+        if not isinstance(sampleRate, int) or not MIN_SAMPLE_RATE <= sampleRate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Unsupported sample rate {sampleRate}")
+        if not isinstance(channels, int) or not 1 <= channels <= MAX_CHANNELS:
+            raise ValueError(f"Unsupported channel count {channels}")
+        self.sampleRate = sampleRate
+        self.channels = channels
+        self.encoding = encoding
+        self.frameBytes = channels * (2 if encoding == PCM16 else 1)
+        self.passthrough = encoding == PCM16 and channels == 1 and sampleRate == self.targetRate
+        self.streamResampler = Resampler(sampleRate, self.targetRate)
+        self.remainder = b''
+
+    def describe(self):
+        return {"sampleRate": self.sampleRate, "channels": self.channels, "encoding": self.encoding}
+
+    def reset(self):
+        """Forget stream state, called when a new stream starts"""
+        self.streamResampler.reset()
+        self.remainder = b''
+
+    def decodeUtterance(self, data):
+        """Decode a complete utterance"""
+        data = data[:len(data) - len(data) % self.frameBytes]
+        return self._decode(data, Resampler(self.sampleRate, self.targetRate))
+
+    def decodeChunk(self, data):
+        """Decode one streamed chunk, a partial frame at the end is kept for the next one"""
+        data = self.remainder + data
+        cut = len(data) - len(data) % self.frameBytes
+        self.remainder = data[cut:]
+        return self._decode(data[:cut], self.streamResampler)
+
+    def _decode(self, data, resampler):
+        self.bytesIn += len(data)
+        if self.passthrough:
+            self.bytesOut += len(data)
+            return data
+        if self.encoding == PCM16:
+            samples = np.frombuffer(data, dtype='<i2')
+        else:
+            samples = DECODE_TABLES[self.encoding][np.frombuffer(data, dtype=np.uint8)]
+        samples = samples.astype(np.float32)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self.sampleRate != self.targetRate:
+            samples = resampler.process(samples)
+        pcm = np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+        self.bytesOut += len(pcm)
+        return pcm
+
+    def getStats(self):
+        return {"format": self.describe(), "bytesIn": self.bytesIn, "bytesOut": self.bytesOut}
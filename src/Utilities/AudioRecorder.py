@@ -1,6 +1,7 @@
 import pyaudio
 import threading
 import time
+from Utilities.VoiceActivityDetector import VoiceActivityDetector
 
 class AudioRecorder:
     """
@@ -8,21 +9,29 @@ class AudioRecorder:
     and converting it to bytes format for transmission
     """
     
-    def __init__(self):
+    def __init__(self, use_vad=False):
         self.audio = pyaudio.PyAudio()
         self.stream = None
         self.recording = False
         self.audio_data = []
         self.recording_thread = None
+        self.on_chunk = None
         
         # Audio configuration (matching Vosk requirements)
         self.CHUNK = 1024
         self.FORMAT = pyaudio.paInt16
         self.CHANNELS = 1
         self.RATE = 16000
+
+        # Optional client-side voice activity detection so silence is never sent
+        self.vad = VoiceActivityDetector(self.RATE) if use_vad else None
+        self.gate = None
     
-    def start_recording(self):
-        """Start recording audio from microphone"""
+    def start_recording(self, on_chunk=None):
+        """
+        Start recording audio from microphone. If on_chunk is given it is
+        called from the recording thread with every captured CHUNK of PCM.
+        """
         if self.recording:
             print("Already recording!")
             return
@@ -36,6 +45,8 @@ class AudioRecorder:
         )
         self.recording = True
         self.audio_data = []
+        self.on_chunk = on_chunk
+        self.gate = self.vad.createGate() if self.vad else None
         
         self.recording_thread = threading.Thread(target=self._record_audio)
         self.recording_thread.start()
@@ -47,6 +58,10 @@ class AudioRecorder:
             try:
                 data = self.stream.read(self.CHUNK, exception_on_overflow=False)
                 self.audio_data.append(data)
+                if self.on_chunk:
+                    speech = self.gate.process(data) if self.gate else [data]
+                    for chunk in speech:
+                        self.on_chunk(chunk)
             except Exception as e:
                 print(f"Recording error: {e}")
                 break
@@ -67,6 +82,8 @@ class AudioRecorder:
             self.stream = None
         
         audio_bytes = b''.join(self.audio_data)
+        if self.vad:
+            audio_bytes = self.vad.trim(audio_bytes)
         print(f"Recording stopped. Captured {len(audio_bytes)} bytes of audio.")
         return audio_bytes
     
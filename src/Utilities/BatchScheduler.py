@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching in front of ModelOptimizer. Requests arriving
+    within windowMs of each other are padded into one batched generate call
+    and each result is handed back to the thread that asked for it. A lone
+    request goes through generateOptimized and keeps the prefix KV cache.
+    """
+
+    def __init__(self, modelOptimizer, windowMs=10, maxBatchSize=8):
+        self.modelOptimizer = modelOptimizer
+        self.window = windowMs / 1000
+        self.maxBatchSize = maxBatchSize
+        self.requests = queue.Queue()
+
+        self.batches = 0
+        self.batchedRequests = 0
+
+        self.worker = threading.Thread(target=self._run, name='llm-batcher', daemon=True)
+        self.worker.start()
+
+    def submit(self, prompt, maxTokens=50, temperature=0.1, constrained=False):
+        """Queue a generation request and return a Future for its text"""
+        future = Future()
+        self.requests.put((prompt, (maxTokens, temperature, constrained), future))
+        return future
+
+    def generate(self, prompt, maxTokens=50, temperature=0.1, constrained=False):
+        """Blocking equivalent of ModelOptimizer.generateOptimized"""
+        return self.submit(prompt, maxTokens, temperature, constrained).result()
+
+    def _collect(self):
+        """Wait for one request, then gather more until the window closes or the batch is full"""
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.maxBatchSize:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Only requests with identical decoding settings can share a generate call
+            groups = {}
+            for prompt, settings, future in batch:
+                groups.setdefault(settings, []).append((prompt, future))
+            for (maxTokens, temperature, constrained), requests in groups.items():
+                self._generate(requests, maxTokens, temperature, constrained)
+
+    def _generate(self, requests, maxTokens, temperature, constrained):
+        prompts = [prompt for prompt, _ in requests]
+        try:
+            if len(prompts) == 1:
+                responses = [self.modelOptimizer.generateOptimized(prompts[0], maxTokens, temperature, constrained)]
+            else:
+                responses = self.modelOptimizer.generateBatch(prompts, maxTokens, temperature, constrained)
+            self.batches += 1
+            self.batchedRequests += len(prompts)
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+        for (_, future), response in zip(requests, responses):
+            future.set_result(response)
+
+    def getStats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.batchedRequests,
+            "averageBatchSize": self.batchedRequests / self.batches if self.batches else 0.0,
+            "queued": self.requests.qsize()
+        }
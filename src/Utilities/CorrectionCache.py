@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from Utilities.ApplicationIndex import normalizeName
+
+
+class CorrectionCache:
+    """
+    Bounded LRU cache of autocorrect results keyed by the normalized
+    transcript and the application registry version. Entries expire after
+    ttlSeconds, the cache is kept under maxEntries and maxBytes, and it is
+    persisted to disk so hits survive restarts.
+    """
+
+    def __init__(self, filePath=None, maxEntries=1024, maxBytes=1024 * 1024,
+                 ttlSeconds=7 * 24 * 3600, saveInterval=5.0):
+        self.filePath = filePath
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.ttlSeconds = ttlSeconds
+        self.saveInterval = saveInterval
+
+        # (transcript, version) -> (result, storedAt, size)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.saveLock = threading.Lock()
+        self.dirty = False
+        self.lastSave = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if filePath and os.path.exists(filePath):
+            self.load()
+
+    def get(self, transcript, version):
+        """Return a copy of the cached result, or None"""
+        key = (normalizeName(transcript), version)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttlSeconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, transcript, version, result):
+        key = (normalizeName(transcript), version)
+        size = len(key[0]) + len(version) + len(json.dumps(result))
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (dict(result), time.time(), size)
+            self.bytes += size
+            while self.entries and (len(self.entries) > self.maxEntries or self.bytes > self.maxBytes):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+            self.dirty = True
+            shouldSave = time.time() - self.lastSave >= self.saveInterval
+        if shouldSave:
+            self.save()
+
+    def _remove(self, key):
+        result, storedAt, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def retainVersion(self, version):
+        """Drop every entry computed against a different registry version"""
+        with self.lock:
+            for key in [key for key in self.entries if key[1] != version]:
+                self._remove(key)
+            self.dirty = True
+        self.save()
+
+    def load(self):
+        """Load unexpired entries from disk, oldest first so LRU order is kept"""
+        try:
+            with open(self.filePath, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            if not isinstance(records, list):
+                raise ValueError("expected a list of records")
+        except Exception as e:
+            print(f"Error loading correction cache: {e}")
+            return
+        now = time.time()
+        with self.lock:
+            for record in records:
+                try:
+                    transcript, version, result, storedAt = record
+                    if not isinstance(transcript, str) or not isinstance(version, str) or not isinstance(result, dict):
+                        raise ValueError("unexpected field types")
+                    if now - float(storedAt) > self.ttlSeconds:
+                        continue
+                    size = len(transcript) + len(version) + len(json.dumps(result))
+                except (TypeError, ValueError) as e:
+                    print(f"Skipping malformed correction cache record: {e}")
+                    continue
+                self.entries[(transcript, version)] = (result, float(storedAt), size)
+                self.bytes += size
+        print(f"Loaded {len(self.entries)} cached corrections")
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        if not self.filePath:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            records = [[key[0], key[1], entry[0], entry[1]] for key, entry in self.entries.items()]
+            self.dirty = False
+            self.lastSave = time.time()
+        try:
+            with self.saveLock:
+                tempPath = self.filePath + '.tmp'
+                with open(tempPath, 'w', encoding='utf-8') as f:
+                    json.dump(records, f, ensure_ascii=False)
+                os.replace(tempPath, self.filePath)
+        except Exception as e:
+            print(f"Error saving correction cache: {e}")
+
+    def getStats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "evictions": self.evictions
+        }
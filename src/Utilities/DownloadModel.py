@@ -4,6 +4,8 @@ import zipfile
 from tqdm import tqdm
 import subprocess
 import sys
+import json
+import hashlib
 
 class ModelDownloader:
     
@@ -14,6 +16,8 @@ class ModelDownloader:
         
         self.llmModelName = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
         self.llmCacheDir = os.path.join(os.path.expanduser("~"), ".cache", "huggingface", "transformers")
+        self.llmFilePatterns = ["*.json", "*.safetensors", "*.model"]
+        self.llmManifestName = "llm_manifest.json"
     
     def setupModelsDirectory(self):
         """Setup models directory"""
@@ -116,38 +120,32 @@ class ModelDownloader:
         print("Setting up LLM model for autocorrect...")
         
         try:
-            # Check if transformers is available
-            import transformers
-            from transformers import AutoTokenizer, AutoModelForCausalLM
+            # huggingface_hub ships with transformers and fetches files without building the model
+            from huggingface_hub import snapshot_download
             
-            # First try to load from local cache only. If this fails then we'll download the model
-            try:
-                _ = AutoTokenizer.from_pretrained(self.llmModelName, local_files_only=True)
-                model = AutoModelForCausalLM.from_pretrained(self.llmModelName, local_files_only=True)
-                totalParams = sum(p.numel() for p in model.parameters())
+            # First verify the local cache against the manifest. If this fails then we'll download the model
+            if self.verifyLlmCache():
                 print("LLM model already cached. Skipping download.")
-                print(f" Model parameters: {totalParams:,}")
                 print(f" Model cache: {self.llmCacheDir}")
                 return True
+            
+            # Files cached before the manifest existed only need to be recorded
+            try:
+                snapshotPath = snapshot_download(self.llmModelName, allow_patterns=self.llmFilePatterns, local_files_only=True)
+                self.writeLlmManifest(snapshotPath)
+                if self.verifyLlmCache():
+                    print("LLM model already cached. Recorded its manifest.")
+                    return True
             except Exception:
                 # Not in cache, proceed to download
                 pass
             
-            print(f"Downloading {self.llmModelName}...")
+            print(f"Downloading {self.llmModelName} (this may take a while)...")
+            snapshotPath = snapshot_download(self.llmModelName, allow_patterns=self.llmFilePatterns)
+            self.writeLlmManifest(snapshotPath)
             
-            # Download tokenizer
-            print("Downloading tokenizer...")
-            tokenizer = AutoTokenizer.from_pretrained(self.llmModelName)
-            
-            # Download model
-            print("Downloading model (this may take a while)...")
-            model = AutoModelForCausalLM.from_pretrained(self.llmModelName)
-            
-            # Get model info
-            totalParams = sum(p.numel() for p in model.parameters())
             print(f" LLM model downloaded successfully!")
-            print(f" Model parameters: {totalParams:,}")
-            print(f" Model cached at: {self.llmCacheDir}")
+            print(f" Model cached at: {snapshotPath}")
             
             return True
             
@@ -161,22 +159,66 @@ class ModelDownloader:
         except Exception as e:
             print(f" Failed to download LLM model: {e}")
             return False
+
+    def hashFile(self, path):
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def writeLlmManifest(self, snapshotPath):
+        """Record the size, mtime and sha256 of every downloaded model file"""
+        files = {}
+        for root, _, names in os.walk(snapshotPath):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files[os.path.relpath(path, snapshotPath)] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "sha256": self.hashFile(path)
+                }
+        manifest = {"model": self.llmModelName, "snapshot": snapshotPath, "files": files}
+        modelsPath = self.setupModelsDirectory()
+        with open(os.path.join(modelsPath, self.llmManifestName), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    def verifyLlmCache(self):
+        """
+        Check the cached LLM files against the manifest without loading the
+        model. Sizes are always compared; a file is only re-hashed when its
+        mtime changed since the manifest was written.
+        """
+        manifestPath = os.path.join("../models", self.llmManifestName)
+        try:
+            with open(manifestPath, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if manifest.get("model") != self.llmModelName or not manifest.get("files"):
+            return False
+
+        snapshotPath = manifest["snapshot"]
+        for relativePath, expected in manifest["files"].items():
+            path = os.path.join(snapshotPath, relativePath)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_size != expected["size"]:
+                return False
+            if stat.st_mtime != expected["mtime"] and self.hashFile(path) != expected["sha256"]:
+                return False
+        return True
     
     def checkLlmAvailability(self):
-        """Check if LLM model is available and working"""
-        try:
-            from transformers import AutoTokenizer, AutoModelForCausalLM
-            
-            # Try to load the model
-            tokenizer = AutoTokenizer.from_pretrained(self.llmModelName, local_files_only=True)
-            model = AutoModelForCausalLM.from_pretrained(self.llmModelName, local_files_only=True)
-            
-            print("LLM model is available and working!")
+        """Check if LLM model is available, without loading it"""
+        if self.verifyLlmCache():
+            print("LLM model is available!")
             return True
-            
-        except Exception as e:
-            print(f" LLM model not available: {e}")
-            return False
+        print(" LLM model not available: cache missing or does not match its manifest")
+        return False
     
     def setupAllModels(self):
         """Setup both Vosk and LLM models"""
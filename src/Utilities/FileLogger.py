@@ -1,19 +1,135 @@
-import datetime as dt
-import os 
+import json
+import os
+import queue
+import threading
+import time
 
 class FileLogger:
+    """
+    Buffered JSON lines logger. writeToFile only enqueues the record; a
+    background writer thread formats records, writes them in batches once
+    flushBytes are buffered or flushInterval has passed, and rotates the
+    file to logging.txt.1, .2, ... when it grows past maxBytes.
+    """
+
+    def __init__(self, filePath="../logs/logging.txt", maxBytes=5 * 1024 * 1024, backupCount=3,
+                 flushInterval=0.5, flushBytes=64 * 1024):
+        self.filePath = filePath
+        self.maxBytes = maxBytes
+        self.backupCount = backupCount
+        self.flushInterval = flushInterval
+        self.flushBytes = flushBytes
+
+        self.records = queue.Queue()
+        self.writer = None
+        self.file = None
+        self.written = 0
+        self.rotations = 0
+
     def setupLogging(self):
-            if not os.path.exists("../logs/logging.txt"):
-                with open("../logs/logging.txt", 'x') as f:
-                    f.write("Logging: START\n")
-            self.wipeLog()
+        """Open the log for appending and start the writer thread"""
+        os.makedirs(os.path.dirname(self.filePath) or '.', exist_ok=True)
+        self.file = open(self.filePath, 'a', encoding='utf-8')
+        self.writer = threading.Thread(target=self._run, name='file-logger', daemon=True)
+        self.writer.start()
+        self.writeToFile("Logging: START")
 
-    def writeToFile(self, info):
-        timestamp = str(dt.datetime.now().timestamp())
-        with open("../logs/logging.txt", 'a') as f:
-            f.write("[" + timestamp + "]: " + info  + "\n")
+    def writeToFile(self, info, requestId=None, **fields):
+        """
+        Queue a log record. requestId ties together the records of one
+        command; any other keyword fields, such as stage timings, are
+        written as they are.
+        """
+        self.records.put((time.time(), info, requestId, fields))
 
     def wipeLog(self):
-        with open("../logs/logging.txt", 'w') as f:
-            f.write("Logging: START\n")
-        print('wipe log ran')
\ No newline at end of file
+        """Clear the current log file once everything queued so far is written"""
+        self.records.put(self._wipe)
+
+    def flush(self):
+        """Block until every record queued so far is on disk"""
+        if self.writer is None:
+            return
+        written = threading.Event()
+        self.records.put(written.set)
+        written.wait()
+
+    def close(self):
+        """Write out the queue and stop the writer thread"""
+        if self.writer is None:
+            return
+        self.records.put(None)
+        self.writer.join()
+        self.writer = None
+
+    def _format(self, record):
+        timestamp, info, requestId, fields = record
+        entry = {"timestamp": timestamp, "message": info}
+        if requestId is not None:
+            entry["requestId"] = requestId
+        entry.update(fields)
+        return json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+    def _run(self):
+        buffer = []
+        bufferedBytes = 0
+        lastFlush = time.monotonic()
+        running = True
+        while running:
+            try:
+                record = self.records.get(timeout=self.flushInterval)
+            except queue.Empty:
+                record = ()
+            if record is None:
+                running = False
+            elif callable(record):
+                # Control actions run after the records queued before them
+                self._write(buffer)
+                buffer, bufferedBytes = [], 0
+                record()
+            elif record:
+                line = self._format(record)
+                buffer.append(line)
+                bufferedBytes += len(line)
+
+            if buffer and (not running or bufferedBytes >= self.flushBytes
+                           or time.monotonic() - lastFlush >= self.flushInterval):
+                self._write(buffer)
+                buffer, bufferedBytes = [], 0
+            if not buffer:
+                lastFlush = time.monotonic()
+        self.file.close()
+
+    def _write(self, lines):
+        if not lines:
+            return
+        try:
+            self.file.write(''.join(lines))
+            self.file.flush()
+            self.written += len(lines)
+            if self.file.tell() >= self.maxBytes:
+                self._rotate()
+        except Exception as e:
+            print(f"Error writing log: {e}")
+
+    def _rotate(self):
+        """Shift logging.txt to logging.txt.1 and older backups one further, dropping the oldest"""
+        self.file.close()
+        for index in range(self.backupCount - 1, 0, -1):
+            source = f"{self.filePath}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.filePath}.{index + 1}")
+        if self.backupCount > 0:
+            os.replace(self.filePath, f"{self.filePath}.1")
+        else:
+            os.remove(self.filePath)
+        self.file = open(self.filePath, 'a', encoding='utf-8')
+        self.rotations += 1
+
+    def _wipe(self):
+        self.file.close()
+        self.file = open(self.filePath, 'w', encoding='utf-8')
+        print('wipe log ran')
+
+    def getStats(self):
+        return {"queued": self.records.qsize(), "written": self.written, "rotations": self.rotations}
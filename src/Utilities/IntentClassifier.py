@@ -0,0 +1,260 @@
+import math
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from Utilities.ApplicationIndex import normalizeName, characterGrams
+from Utilities.PromptExamples import loadPromptExamples
+
+
+class IntentClassifier:
+    """
+    Correction backend that picks a command without generating text. Each
+    command, each application and NO_MATCH is one TF-IDF weighted class
+    over hashed character n-grams, built from the command registry, the
+    examples in AutocorrectPrompt.txt and the application names. Classes
+    are kept as postings, for every n-gram the classes that use it and how
+    often, so a transcript only touches the classes it shares n-grams with
+    and an application change only updates its own class and the classes
+    sharing its n-grams. Answers below minScore, or too close to the
+    runner-up, are left to the LLM.
+    """
+
+    def __init__(self, commandRegistry, appRegistry, noMatch='NO_MATCH', dimensions=4096,
+                 gramSizes=(2, 3, 4), minScore=0.3, minMargin=0.15,
+                 promptPath='Utilities/AutocorrectPrompt.txt'):
+        self.commandRegistry = commandRegistry
+        self.appRegistry = appRegistry
+        self.noMatch = noMatch
+        self.openCommand = 'open <application_name>'
+        # n-grams are hashed into a fixed number of columns so the document
+        # frequencies stay small no matter how many applications are installed
+        self.dimensions = dimensions
+        self.gramSizes = gramSizes
+        self.minScore = minScore
+        self.minMargin = minMargin
+
+        try:
+            self.examples = loadPromptExamples(promptPath)
+        except OSError as e:
+            print(f"Error loading prompt examples: {e}")
+            self.examples = []
+
+        # Every class structure below is guarded by lock, updates happen in place
+        self.lock = threading.Lock()
+
+        self.classified = 0
+        self.confident = 0
+
+        self.rebuild()
+        commandRegistry.addListener(self.onCommandAdded)
+        appRegistry.addListener(self.onApplicationsChanged)
+
+    def _features(self, text):
+        """Hashed column of every character n-gram in text"""
+        normalized = normalizeName(text)
+        if not normalized:
+            return []
+        columns = []
+        for size in self.gramSizes:
+            for gram in characterGrams(normalized, size):
+                columns.append(zlib.crc32(gram.encode('utf-8')) % self.dimensions)
+        return columns
+
+    def _terms(self, texts):
+        """Sorted columns and their log scaled term frequencies for one class"""
+        counts = Counter(column for text in texts for column in self._features(text))
+        columns = np.array(sorted(counts), dtype=np.int64)
+        frequencies = np.array([1 + math.log(counts[column]) for column in columns], dtype=np.float64)
+        return columns, frequencies
+
+    def _applicationDocument(self, name, path):
+        texts = [f"{verb} {name}" for verb in self.openVerbs]
+        texts += self.examplesByOutput.get(f"open {name}".lower(), [])
+        return (f"open {name}", [name, path], texts)
+
+    def _documents(self):
+        """One (label, app, texts) entry per class"""
+        self.examplesByOutput = {}
+        for userInput, output in self.examples:
+            self.examplesByOutput.setdefault(output.lower(), []).append(userInput)
+        self.openVerbs = self.commandRegistry.synonyms.get(self.openCommand, ['open'])
+
+        documents = []
+        for command in self.commandRegistry.getAvailableCommands():
+            if command == self.openCommand:
+                continue
+            texts = [command] + self.commandRegistry.synonyms.get(command, [])
+            documents.append((command, None, texts + self.examplesByOutput.get(command.lower(), [])))
+
+        for name, path in self.appRegistry.apps:
+            documents.append(self._applicationDocument(name, path))
+
+        documents.append((self.noMatch, None, self.examplesByOutput.get(self.noMatch.lower(), [])))
+        return documents
+
+    def rebuild(self):
+        """Recompute every class from the current commands and applications"""
+        documents = self._documents()
+        with self.lock:
+            # Rows are never reused, removed ones keep their slot until the next rebuild
+            self.labels = []
+            self.terms = []
+            self.active = np.zeros(0, dtype=bool)
+            self.rowsByApp = {}
+            self.activeRows = 0
+            self.documentFrequency = np.zeros(self.dimensions, dtype=np.int64)
+            # column -> (rows, term frequencies)
+            self.postings = {}
+            # Per row sums of tf², tf²·log(1 + df) and tf²·log(1 + df)², from
+            # which the TF-IDF norm follows for any number of classes
+            self.normSums = np.zeros((0, 3), dtype=np.float64)
+            self._update(documents, [])
+
+    def _update(self, documents, removedRows):
+        """Add documents and drop removedRows, adjusting only the rows that share their columns"""
+        firstNew = len(self.labels)
+        before = {}
+
+        for row in removedRows:
+            columns, frequencies = self.terms[row]
+            for column in columns.tolist():
+                before.setdefault(column, self.documentFrequency[column])
+            self.documentFrequency[columns] -= 1
+            self.active[row] = False
+            self.terms[row] = None
+            app = self.labels[row][1]
+            if app is not None:
+                self.rowsByApp[tuple(app)].remove(row)
+            self.activeRows -= 1
+
+        added = {}
+        for offset, (label, app, texts) in enumerate(documents):
+            row = firstNew + offset
+            columns, frequencies = self._terms(texts)
+            for column in columns.tolist():
+                before.setdefault(column, self.documentFrequency[column])
+            self.documentFrequency[columns] += 1
+            self.labels.append((label, app))
+            self.terms.append((columns, frequencies))
+            if app is not None:
+                self.rowsByApp.setdefault(tuple(app), []).append(row)
+            for column, frequency in zip(columns.tolist(), frequencies.tolist()):
+                entry = added.setdefault(column, ([], []))
+                entry[0].append(row)
+                entry[1].append(frequency)
+        self.activeRows += len(documents)
+        self.active = np.concatenate((self.active, np.ones(len(documents), dtype=bool)))
+        self.normSums = np.concatenate((self.normSums, np.zeros((len(documents), 3))))
+
+        removed = np.array(removedRows, dtype=np.int64)
+        for column, previousFrequency in before.items():
+            rows, frequencies = self.postings.get(column, (np.zeros(0, dtype=np.int64), np.zeros(0)))
+            if len(removed):
+                keep = ~np.isin(rows, removed)
+                rows, frequencies = rows[keep], frequencies[keep]
+            # Rows that were already there only see this column's document frequency change
+            squared = frequencies ** 2
+            oldLog = math.log(1 + previousFrequency)
+            newLog = math.log(1 + self.documentFrequency[column])
+            self.normSums[rows, 1] += squared * (newLog - oldLog)
+            self.normSums[rows, 2] += squared * (newLog ** 2 - oldLog ** 2)
+            if column in added:
+                newRows, newFrequencies = added[column]
+                rows = np.concatenate((rows, np.array(newRows, dtype=np.int64)))
+                frequencies = np.concatenate((frequencies, np.array(newFrequencies)))
+            if len(rows):
+                self.postings[column] = (rows, frequencies)
+            else:
+                self.postings.pop(column, None)
+
+        for row in range(firstNew, len(self.labels)):
+            columns, frequencies = self.terms[row]
+            squared = frequencies ** 2
+            logs = np.log1p(self.documentFrequency[columns])
+            self.normSums[row] = (squared.sum(), (squared * logs).sum(), (squared * logs ** 2).sum())
+
+    def onCommandAdded(self, command):
+        self.rebuild()
+
+    def onApplicationsChanged(self, added, removed):
+        documents = [self._applicationDocument(name, path) for name, path in added]
+        with self.lock:
+            taken = Counter()
+            removedRows = []
+            for app in removed:
+                key = tuple(app)
+                rows = self.rowsByApp.get(key, [])
+                if taken[key] < len(rows):
+                    taken[key] += 1
+                    removedRows.append(rows[-taken[key]])
+            holes = len(self.labels) - self.activeRows + len(removedRows)
+            # Once removed rows outnumber the live ones, start over with a compact layout
+            compact = holes > max(self.activeRows - len(removedRows), 64)
+            if not compact:
+                self._update(documents, removedRows)
+        if compact:
+            self.rebuild()
+
+    def _idf(self):
+        """Smoothed inverse document frequency, n-grams shared by many classes weigh little"""
+        return math.log(1 + self.activeRows) + 1 - np.log1p(self.documentFrequency)
+
+    def classify(self, transcript, k=3):
+        """Return the k best (score, label, app) candidates, best first"""
+        columns = Counter(self._features(transcript))
+        if not columns:
+            return []
+
+        with self.lock:
+            idf = self._idf()
+            weights = {column: (1 + math.log(count)) * idf[column] for column, count in columns.items()}
+            # Columns no class uses still count towards the length, so unknown words lower the score
+            queryNorm = max(math.sqrt(sum(weight ** 2 for weight in weights.values())), 1e-9)
+
+            scores = np.zeros(len(self.labels), dtype=np.float64)
+            for column, weight in weights.items():
+                posting = self.postings.get(column)
+                if posting is not None:
+                    rows, frequencies = posting
+                    scores[rows] += frequencies * (weight * idf[column])
+
+            # |tf·idf|² expands to a²Σtf² - 2aΣtf²·log(1 + df) + Σtf²·log(1 + df)²
+            scale = math.log(1 + self.activeRows) + 1
+            squaredNorms = scale ** 2 * self.normSums[:, 0] - 2 * scale * self.normSums[:, 1] + self.normSums[:, 2]
+            scores /= np.sqrt(np.maximum(squaredNorms, 1e-18)) * queryNorm
+            scores[~self.active] = -np.inf
+
+            k = min(k, self.activeRows)
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.labels[i][0], self.labels[i][1]) for i in top]
+
+    def predict(self, transcript):
+        """Return a command dict when the classifier is confident, otherwise None"""
+        candidates = self.classify(transcript, k=2)
+        self.classified += 1
+        if not candidates or candidates[0][0] < self.minScore:
+            return None
+        if len(candidates) > 1 and candidates[0][0] - candidates[1][0] < self.minMargin:
+            return None
+        self.confident += 1
+
+        score, label, app = candidates[0]
+        if app is not None:
+            return {"command": f"open {app[0].lower()}", "path": app[1]}
+        if label == self.noMatch:
+            return {"command": transcript}
+        return {"command": label}
+
+    def getStats(self):
+        return {
+            "classified": self.classified,
+            "confident": self.confident,
+            "confidentRate": self.confident / self.classified if self.classified else 0.0,
+            "classes": self.activeRows
+        }
@@ -0,0 +1,159 @@
+import threading
+from Utilities.ApplicationIndex import normalizeName
+
+# Words that carry no intent and are ignored when classifying a transcript
+FILLER_WORDS = {'the', 'a', 'an', 'my', 'please', 'up', 'now', 'for', 'me'}
+
+
+class TrieNode:
+    __slots__ = ('children', 'apps')
+
+    def __init__(self):
+        self.children = {}
+        # [name, path] entries whose full token sequence ends at this node
+        self.apps = []
+
+
+class IntentMatcher:
+    """
+    Deterministic fast path for Autocorrect. Resolves transcripts that map to
+    exactly one command without calling the LLM:
+      - "<open verb> <application name>" where the rest of the transcript is
+        exactly a known application, looked up in a token trie, or is a
+        clear winner in the registry's fuzzy application index
+      - transcripts whose every non-filler word belongs to a single command's
+        keyword set, e.g. "lock screen", "stop media", "resume"
+    Anything else is ambiguous and returns None so the caller can use the LLM.
+    """
+
+    def __init__(self, commandRegistry, appRegistry, fuzzyScore=0.75, fuzzyMargin=0.1):
+        self.commandRegistry = commandRegistry
+        self.appIndex = appRegistry.index
+        # A fuzzy match must score this well and beat the runner-up by this much
+        self.fuzzyScore = fuzzyScore
+        self.fuzzyMargin = fuzzyMargin
+        self.lock = threading.Lock()
+        self.openCommand = 'open <application_name>'
+        self.openVerbs = set()
+        self.keywordCommands = {}
+        self.appTrie = TrieNode()
+
+        self.hits = 0
+        self.misses = 0
+
+        for command in commandRegistry.getAvailableCommands():
+            self.addCommand(command)
+        for app in appRegistry.apps:
+            self.addApp(app[0], app[1])
+
+        commandRegistry.addListener(self.addCommand)
+        appRegistry.addListener(self.onApplicationsChanged)
+
+    def addCommand(self, command):
+        """Index a command's own words and synonyms"""
+        synonyms = self.commandRegistry.synonyms.get(command, [])
+        with self.lock:
+            if command == self.openCommand:
+                self.openVerbs.update(synonyms)
+                return
+            for word in normalizeName(command).split() + synonyms:
+                self.keywordCommands.setdefault(word, set()).add(command)
+
+    def addApp(self, name, path):
+        with self.lock:
+            node = self.appTrie
+            for token in normalizeName(name).split():
+                node = node.children.setdefault(token, TrieNode())
+            node.apps.append([name, path])
+
+    def removeApp(self, name, path):
+        with self.lock:
+            node = self.appTrie
+            trail = []
+            for token in normalizeName(name).split():
+                if token not in node.children:
+                    return
+                trail.append((node, token))
+                node = node.children[token]
+            if [name, path] in node.apps:
+                node.apps.remove([name, path])
+            # Prune branches that no longer lead to any application
+            for parent, token in reversed(trail):
+                child = parent.children[token]
+                if child.apps or child.children:
+                    break
+                del parent.children[token]
+
+    def onApplicationsChanged(self, added, removed):
+        """ApplicationRegistry listener that applies only the changed entries"""
+        for name, path in removed:
+            self.removeApp(name, path)
+        for name, path in added:
+            self.addApp(name, path)
+
+    def match(self, transcript):
+        """Return a command dict for an unambiguous transcript, otherwise None"""
+        tokens = normalizeName(transcript).split()
+        with self.lock:
+            result = self._matchOpen(tokens) if tokens else None
+            if result is None and tokens:
+                result = self._matchKeywords(tokens)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def _matchOpen(self, tokens):
+        if tokens[0] not in self.openVerbs:
+            return None
+        rest = tokens[1:]
+        app = self._lookupApp(rest)
+        if app is None and rest and rest[0] in FILLER_WORDS:
+            app = self._lookupApp(rest[1:])
+        if app is None and rest:
+            app = self._fuzzyLookupApp(' '.join(rest))
+        if app is None:
+            return None
+        return {"command": f"open {app[0].lower()}", "path": app[1]}
+
+    def _lookupApp(self, tokens):
+        node = self.appTrie
+        for token in tokens:
+            node = node.children.get(token)
+            if node is None:
+                return None
+        return node.apps[0] if tokens and node.apps else None
+
+    def _fuzzyLookupApp(self, name):
+        """Accept a misspelled application name only when one candidate clearly wins"""
+        candidates = self.appIndex.search(name, limit=2, minScore=self.fuzzyScore)
+        if not candidates:
+            return None
+        if len(candidates) > 1 and candidates[0][0] - candidates[1][0] < self.fuzzyMargin:
+            return None
+        return candidates[0][1]
+
+    def _matchKeywords(self, tokens):
+        candidates = None
+        for token in tokens:
+            if token in FILLER_WORDS:
+                continue
+            commands = self.keywordCommands.get(token)
+            if not commands:
+                return None
+            candidates = set(commands) if candidates is None else candidates & commands
+            if not candidates:
+                return None
+        if candidates is None or len(candidates) != 1:
+            return None
+        return {"command": next(iter(candidates))}
+
+    def getStats(self):
+        """Get fast-path hit and miss counts"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import deque
+
+
+class LatencyTracker:
+    """
+    Rolling latency histograms for named spans. Each span keeps its last
+    windowSize durations; recording one is an append under a lock, and
+    percentiles are only computed when stats are requested.
+    """
+
+    def __init__(self, windowSize=1024):
+        self.windowSize = windowSize
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, milliseconds):
+        with self.lock:
+            window = self.samples.get(name)
+            if window is None:
+                window = self.samples[name] = deque(maxlen=self.windowSize)
+                self.counts[name] = 0
+            window.append(milliseconds)
+            self.counts[name] += 1
+
+    def span(self, name):
+        """Context manager that records how long its block took"""
+        return LatencySpan(self, name)
+
+    def getStats(self):
+        """p50/p95/p99, mean and max in milliseconds over each span's window"""
+        with self.lock:
+            windows = {name: sorted(window) for name, window in self.samples.items()}
+            counts = dict(self.counts)
+        stats = {}
+        for name, ordered in windows.items():
+            stats[name] = {
+                "count": counts[name],
+                "p50Ms": self._percentile(ordered, 0.50),
+                "p95Ms": self._percentile(ordered, 0.95),
+                "p99Ms": self._percentile(ordered, 0.99),
+                "meanMs": sum(ordered) / len(ordered),
+                "maxMs": ordered[-1]
+            }
+        return stats
+
+    def _percentile(self, ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+
+
+class LatencySpan:
+    __slots__ = ('tracker', 'name', 'start')
+
+    def __init__(self, tracker, name):
+        self.tracker = tracker
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.tracker.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
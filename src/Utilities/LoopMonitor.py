@@ -0,0 +1,49 @@
+import asyncio
+import time
+from collections import deque
+
+
+class LoopMonitor:
+    """
+    Measures how responsive the asyncio event loop is by scheduling a
+    periodic wake-up and recording how late it actually fires
+    """
+
+    def __init__(self, interval=0.05, historySize=1200):
+        self.interval = interval
+        self.lags = deque(maxlen=historySize)
+        self.maxLag = 0.0
+        self.task = None
+
+    def start(self):
+        """Start monitoring on the running event loop"""
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._monitor())
+        return self.task
+
+    def stop(self):
+        """Stop monitoring"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _monitor(self):
+        """Sleep for the interval and record how far past the deadline the loop woke up"""
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.lags.append(lag)
+            if lag > self.maxLag:
+                self.maxLag = lag
+
+    def getStats(self):
+        """Get loop lag statistics in milliseconds"""
+        if not self.lags:
+            return {"samples": 0, "avgLagMs": 0.0, "recentMaxLagMs": 0.0, "maxLagMs": 0.0}
+        return {
+            "samples": len(self.lags),
+            "avgLagMs": sum(self.lags) / len(self.lags) * 1000,
+            "recentMaxLagMs": max(self.lags) * 1000,
+            "maxLagMs": self.maxLag * 1000
+        }
@@ -2,18 +2,74 @@
 Model optimization utilities for faster LLM inference
 """
 
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
 import os
+import copy
+import threading
+import time
+from contextlib import nullcontext
+from Utilities.OutputTrie import OutputTrie
+
+# torch and transformers take seconds to import, so they are only imported
+# when a model is actually loaded and stay off the server's startup path
+torch = None
+AutoTokenizer = None
+AutoModelForCausalLM = None
+LogitsProcessorList = None
+
+def importModelLibraries():
+    """Import torch and transformers into this module on first use"""
+    global torch, AutoTokenizer, AutoModelForCausalLM, LogitsProcessorList
+    if torch is None:
+        from transformers import AutoTokenizer, AutoModelForCausalLM, LogitsProcessorList
+        import torch
+
+class FirstTokenTimer:
+    """
+    Logits processor that notes when generate first asks for next token
+    scores, which is right after the prompt's prefill forward pass.
+    """
+
+    def __init__(self):
+        self.firstTokenAt = None
+
+    def __call__(self, inputIds, scores):
+        if self.firstTokenAt is None:
+            self.firstTokenAt = time.perf_counter()
+        return scores
 
 class ModelOptimizer:
     """Optimizes model loading and inference for better performance"""
     
-    def __init__(self):
+    def __init__(self, quantization=None, persistQuantized=True, latencyTracker=None):
         self.model = None
         self.tokenizer = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Chosen when the model is loaded unless set beforehand
+        self.device = None
         self.model_loaded = False  # Track if model is already loaded
+
+        # "int8" runs the linear layers with dynamic int8 quantization on CPU
+        self.quantization = quantization
+        # Keep the quantized model on disk so later loads skip the float32 load and conversion
+        self.persistQuantized = persistQuantized
+        self.quantizedDirectory = "../models"
+
+        # Records tokenize, prefill and decode spans when set
+        self.latencyTracker = latencyTracker
+
+        # Longer prompts lose their start rather than the user input at the end
+        self.maxPromptTokens = 1024
+
+        # Static prompt prefix whose KV cache is reused across requests
+        self.prefixText = None
+        self.prefixIds = None
+        self.prefixCache = None
+        # Guards the prefix cache and output trie, which worker threads share
+        self.cacheLock = threading.Lock()
+
+        # Valid outputs for constrained decoding, compiled to a token trie on first use
+        self.allowedOutputs = None
+        self.outputAnchor = ''
+        self.outputTrie = None
     
     def loadOptimizedModel(self, modelName="TinyLlama/TinyLlama-1.1B-Chat-v1.0"):
         """Load model with optimizations for faster inference"""
@@ -24,33 +80,46 @@ class ModelOptimizer:
         
         try:
             print(f"Loading optimized model: {modelName}")
+            importModelLibraries()
+            if self.device is None:
+                self.device = "cuda" if torch.cuda.is_available() else "cpu"
             
             # Load tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(modelName)
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
-                self.tokenizer.pad_token_id = self.tokenizer.eos_token_id
+            tokenizer = AutoTokenizer.from_pretrained(modelName)
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+                tokenizer.pad_token_id = tokenizer.eos_token_id
+            # Batched prompts are padded on the left so every row ends where generation starts
+            tokenizer.padding_side = "left"
+            tokenizer.truncation_side = "left"
             
-            # Load model with optimizations
-            self.model = AutoModelForCausalLM.from_pretrained(
-                modelName,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None,
-                low_cpu_mem_usage=True
-            )
+            quantized = self.quantization == "int8" and self.device == "cpu"
+            if quantized:
+                model = self._loadQuantizedModel(modelName)
+            else:
+                # Load model with optimizations
+                model = AutoModelForCausalLM.from_pretrained(
+                    modelName,
+                    torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+                    device_map="auto" if self.device == "cuda" else None,
+                    low_cpu_mem_usage=True
+                )
             
             # Optimize for inference
-            self.model.eval()
+            model.eval()
             
-            # Compile model for faster inference (PyTorch 2.0+)
-            if hasattr(torch, 'compile'):
+            # Compile model for faster inference (PyTorch 2.0+), dynamic quantized kernels don't compile
+            if hasattr(torch, 'compile') and not quantized:
                 try:
-                    self.model = torch.compile(self.model)
+                    model = torch.compile(model)
                     print("Model compiled for faster inference")
                 except Exception as e:
                     print(f"Model compilation failed: {e}")
             
-            # Mark model as loaded
+            # Publish the finished model last, so requests served while it was
+            # loading never see a half initialized tokenizer and model pair
+            self.tokenizer = tokenizer
+            self.model = model
             self.model_loaded = True
             print("Optimized model loaded successfully!")
             return True
@@ -59,49 +128,240 @@ class ModelOptimizer:
             print(f"Failed to load optimized model: {e}")
             return False
     
-    def generateOptimized(self, prompt, maxTokens=50, temperature=0.1):
-        """Generate text with optimizations"""
+    def _quantizedModelPath(self, modelName, config):
+        """
+        Quantized weights are tied to the torch and transformers versions
+        that produced them and to the exact model revision they came from
+        """
+        import transformers
+        safeName = modelName.replace('/', '__')
+        revision = getattr(config, '_commit_hash', None) or 'local'
+        return os.path.join(
+            self.quantizedDirectory,
+            f"{safeName}-{revision[:12]}-int8-torch{torch.__version__}-transformers{transformers.__version__}.pt"
+        )
+
+    def _quantize(self, model):
+        model.eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def _loadQuantizedModel(self, modelName):
+        """
+        Load the int8 weights from disk into a freshly quantized skeleton of
+        the model, or quantize the float32 model and persist its weights.
+        Only the state dict is stored and it is loaded with weights_only, so
+        reading the file never runs pickled code.
+        """
+        from transformers import AutoConfig
+        config = AutoConfig.from_pretrained(modelName)
+        quantizedPath = self._quantizedModelPath(modelName, config)
+        if self.persistQuantized and os.path.exists(quantizedPath):
+            print(f"Loading int8 model from {quantizedPath}")
+            try:
+                # The skeleton's weights are overwritten right away, so skip initializing them
+                try:
+                    from transformers.modeling_utils import no_init_weights
+                except ImportError:
+                    no_init_weights = nullcontext
+                with no_init_weights():
+                    model = AutoModelForCausalLM.from_config(config, torch_dtype=torch.float32)
+                model = self._quantize(model)
+                model.load_state_dict(torch.load(quantizedPath, weights_only=True))
+                return model
+            except Exception as e:
+                print(f"Failed to load int8 model, quantizing again: {e}")
+
+        model = AutoModelForCausalLM.from_pretrained(
+            modelName,
+            torch_dtype=torch.float32,
+            low_cpu_mem_usage=True
+        )
+        print("Quantizing linear layers to int8...")
+        model = self._quantize(model)
+
+        if self.persistQuantized:
+            try:
+                os.makedirs(self.quantizedDirectory, exist_ok=True)
+                tempPath = quantizedPath + '.tmp'
+                torch.save(model.state_dict(), tempPath)
+                os.replace(tempPath, quantizedPath)
+                print(f"Saved int8 model to {quantizedPath}")
+            except Exception as e:
+                print(f"Failed to save int8 model: {e}")
+        return model
+
+    def setPromptPrefix(self, prefix):
+        """
+        Set the static start shared by every prompt. Its tokens and
+        past_key_values are computed once, on the next generation, and
+        prompts starting with it only prefill the remaining suffix.
+        Setting a different prefix invalidates the cached one.
+        """
+        with self.cacheLock:
+            if prefix == self.prefixText:
+                return
+            self.prefixText = prefix or None
+            self.prefixIds = None
+            self.prefixCache = None
+
+    def _prepareCachedInputs(self, prompt):
+        """
+        Tokenize only the part of prompt after the cached prefix, prefilling
+        the prefix first if needed. Returns None if prompt doesn't start with it.
+        """
+        with self.cacheLock:
+            if not self.prefixText or not prompt.startswith(self.prefixText):
+                return None
+            if self.prefixCache is None:
+                prefixIds = self.tokenizer(self.prefixText, return_tensors="pt")['input_ids'].to(self.device)
+                with torch.no_grad():
+                    outputs = self.model(prefixIds, use_cache=True)
+                self.prefixIds = prefixIds
+                self.prefixCache = outputs.past_key_values
+            prefixLength = len(self.prefixText)
+            prefixIds = self.prefixIds
+            # generate extends the cache in place, so every request works on its own copy
+            prefixCache = copy.deepcopy(self.prefixCache)
+
+        suffixIds = self.tokenizer(
+            prompt[prefixLength:],
+            return_tensors="pt",
+            add_special_tokens=False
+        )['input_ids'].to(self.device)
+        inputIds = torch.cat([prefixIds, suffixIds], dim=1)
+        return {
+            'input_ids': inputIds,
+            'attention_mask': torch.ones_like(inputIds),
+            'past_key_values': prefixCache
+        }
+
+    def setAllowedOutputs(self, outputs, anchor=''):
+        """
+        Set the finite list of strings constrained generation may produce.
+        anchor is the text the prompt ends with right before the answer.
+        """
+        with self.cacheLock:
+            self.allowedOutputs = list(outputs)
+            self.outputAnchor = anchor
+            self.outputTrie = None
+
+    def _getOutputTrie(self):
+        with self.cacheLock:
+            if self.outputTrie is None and self.allowedOutputs:
+                self.outputTrie = OutputTrie(self.tokenizer, self.allowedOutputs, self.outputAnchor)
+            return self.outputTrie
+
+    def _decodingSettings(self, maxTokens, temperature, constrained, promptLength):
+        """generate() keyword arguments for sampled or trie-constrained greedy decoding"""
+        outputTrie = self._getOutputTrie() if constrained else None
+        if outputTrie is None:
+            return {"do_sample": True, "temperature": temperature, "max_new_tokens": maxTokens}
+        return {
+            "do_sample": False,
+            "max_new_tokens": min(maxTokens, outputTrie.maxLength + 1),
+            "prefix_allowed_tokens_fn": lambda batchId, ids: outputTrie.allowedTokens(ids[promptLength:].tolist())
+        }
+
+    def generateOptimized(self, prompt, maxTokens=50, temperature=0.1, constrained=False):
+        """
+        Generate text with optimizations and return only the newly generated text.
+        With constrained=True decoding is greedy, restricted to the outputs given
+        to setAllowedOutputs, and stops as soon as one of them is complete.
+        """
         if self.model is None or self.tokenizer is None:
             return None
         
         try:
-            # Tokenize with truncation
-            inputs = self.tokenizer(
-                prompt, 
-                return_tensors="pt", 
-                truncation=True, 
-                max_length=512,
-                padding=True
-            )
-            
-            # Ensure attention mask is created properly
-            if 'attention_mask' not in inputs:
-                # Create attention mask manually if not provided
-                inputs['attention_mask'] = (inputs['input_ids'] != self.tokenizer.pad_token_id).long()
-            
-            # Move to device
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            # Reuse the prefilled prompt prefix when possible
+            with self._span("llm.tokenize"):
+                inputs = self._prepareCachedInputs(prompt)
+                if inputs is None:
+                    inputs = self._tokenizePrompt(prompt)
+            promptLength = inputs['input_ids'].shape[1]
+
+            decoding = self._decodingSettings(maxTokens, temperature, constrained, promptLength)
             
             # Generate with optimizations
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs['input_ids'],
-                    attention_mask=inputs['attention_mask'],  # Explicitly pass attention mask
-                    max_new_tokens=maxTokens,
-                    temperature=temperature,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                    use_cache=True  # Enable KV cache for faster generation
-                )
+            outputs = self._runGenerate(inputs, decoding)
             
-            # Decode response
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
+            # Decode only the generated tokens, the prompt already names every command
+            response = self.tokenizer.decode(outputs[0][promptLength:], skip_special_tokens=True)
+            return response.strip()
             
         except Exception as e:
             print(f"Optimized generation failed: {e}")
             return None
+
+    def generateBatch(self, prompts, maxTokens=50, temperature=0.1, constrained=False):
+        """
+        Generate for several prompts in one padded forward pass per step and
+        return one response per prompt. Rows are left padded, so the prefix
+        KV cache is not used here; BatchScheduler sends lone requests through
+        generateOptimized instead.
+        """
+        if self.model is None or self.tokenizer is None:
+            return [None] * len(prompts)
+
+        try:
+            with self._span("llm.tokenize"):
+                inputs = self._tokenizePrompt(prompts)
+            promptLength = inputs['input_ids'].shape[1]
+
+            decoding = self._decodingSettings(maxTokens, temperature, constrained, promptLength)
+
+            outputs = self._runGenerate(inputs, decoding)
+
+            return [
+                self.tokenizer.decode(row[promptLength:], skip_special_tokens=True).strip()
+                for row in outputs
+            ]
+
+        except Exception as e:
+            print(f"Batched generation failed: {e}")
+            return [None] * len(prompts)
+
+    def _span(self, name):
+        if self.latencyTracker is None:
+            return nullcontext()
+        return self.latencyTracker.span(name)
+
+    def _runGenerate(self, inputs, decoding):
+        """model.generate, split into prefill and decode time when a latency tracker is set"""
+        timer = None
+        if self.latencyTracker is not None:
+            timer = FirstTokenTimer()
+            decoding = dict(decoding, logits_processor=LogitsProcessorList([timer]))
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                **decoding,
+                pad_token_id=self.tokenizer.eos_token_id,
+                eos_token_id=self.tokenizer.eos_token_id,
+                use_cache=True  # Enable KV cache for faster generation
+            )
+        if timer is not None and timer.firstTokenAt is not None:
+            self.latencyTracker.record("llm.prefill", (timer.firstTokenAt - start) * 1000)
+            self.latencyTracker.record("llm.decode", (time.perf_counter() - timer.firstTokenAt) * 1000)
+        return outputs
+
+    def _tokenizePrompt(self, prompt):
+        """Tokenize a whole prompt, or a list of prompts, with truncation"""
+        inputs = self.tokenizer(
+            prompt, 
+            return_tensors="pt", 
+            truncation=True, 
+            max_length=self.maxPromptTokens,
+            padding=True
+        )
+        
+        # Ensure attention mask is created properly
+        if 'attention_mask' not in inputs:
+            # Create attention mask manually if not provided
+            inputs['attention_mask'] = (inputs['input_ids'] != self.tokenizer.pad_token_id).long()
+        
+        # Move to device
+        return {k: v.to(self.device) for k, v in inputs.items()}
     
     def getModelInfo(self):
         """Get information about the loaded model"""
@@ -116,6 +376,7 @@ class ModelOptimizer:
             "totalParameters": totalParams,
             "trainableParameters": trainableParams,
             "modelDtype": next(self.model.parameters()).dtype,
+            "quantization": self.quantization,
             "modelLoaded": self.model_loaded
         }
     
@@ -125,7 +386,10 @@ class ModelOptimizer:
     
     def resetModel(self):
         """Reset model state (useful for testing or memory management)"""
+        self.model_loaded = False
         self.model = None
         self.tokenizer = None
-        self.model_loaded = False
+        with self.cacheLock:
+            self.prefixIds = None
+            self.prefixCache = None
         print("Model state reset")
@@ -0,0 +1,47 @@
+class OutputTrie:
+    """
+    Token-level trie of every string the model is allowed to answer with.
+    Used as a generate() prefix_allowed_tokens_fn so decoding can only walk
+    valid outputs and is forced to stop as soon as one is complete.
+    """
+
+    END = -1
+
+    def __init__(self, tokenizer, outputs, anchor=''):
+        self.eosTokenId = tokenizer.eos_token_id
+        self.root = {}
+        self.maxLength = 0
+        anchorIds = self._encode(tokenizer, anchor) if anchor else []
+        for text in outputs:
+            ids = self._encodeContinuation(tokenizer, anchorIds, anchor, text)
+            node = self.root
+            for tokenId in ids:
+                node = node.setdefault(tokenId, {})
+            node[self.END] = text
+            self.maxLength = max(self.maxLength, len(ids))
+
+    def _encode(self, tokenizer, text):
+        return tokenizer(text, add_special_tokens=False)['input_ids']
+
+    def _encodeContinuation(self, tokenizer, anchorIds, anchor, text):
+        """
+        Tokenize text as it appears right after anchor (the end of the prompt),
+        since SentencePiece tokenizes a word differently at the start of a string
+        """
+        if anchorIds:
+            ids = self._encode(tokenizer, anchor + text)
+            if ids[:len(anchorIds)] == anchorIds:
+                return ids[len(anchorIds):]
+        return self._encode(tokenizer, text)
+
+    def allowedTokens(self, generatedIds):
+        """Return the token ids that may follow the already generated ids"""
+        node = self.root
+        for tokenId in generatedIds:
+            node = node.get(tokenId)
+            if node is None:
+                return [self.eosTokenId]
+        allowed = [tokenId for tokenId in node if tokenId != self.END]
+        if self.END in node:
+            allowed.append(self.eosTokenId)
+        return allowed or [self.eosTokenId]
@@ -0,0 +1,9 @@
+import re
+
+EXAMPLE_PATTERN = re.compile(r'Input:\s*"([^"]*)"\s*→\s*Output:\s*"([^"]*)"')
+
+
+def loadPromptExamples(promptPath='Utilities/AutocorrectPrompt.txt'):
+    """Return the (input, output) example pairs listed in the autocorrect prompt"""
+    with open(promptPath, 'r', encoding='utf-8') as file:
+        return EXAMPLE_PATTERN.findall(file.read())
@@ -0,0 +1,65 @@
+import threading
+from vosk import KaldiRecognizer
+
+
+class RecognizerPool:
+    """
+    Hands out KaldiRecognizers built over one shared Vosk Model. Released
+    recognizers are reset and kept for reuse instead of being rebuilt.
+    The model may be assigned after construction, before the first acquire.
+    """
+
+    def __init__(self, model, sampleRate=16000, maxIdle=8):
+        self.model = model
+        self.sampleRate = sampleRate
+        self.maxIdle = maxIdle
+        self.idle = []
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self):
+        """Get a recognizer with clean decoder state"""
+        with self.lock:
+            if self.idle:
+                self.reused += 1
+                return self.idle.pop()
+            self.created += 1
+        recognizer = KaldiRecognizer(self.model, self.sampleRate)
+        recognizer.SetWords(True)
+        return recognizer
+
+    def release(self, recognizer):
+        """Reset a recognizer and return it to the pool"""
+        recognizer.Reset()
+        with self.lock:
+            if len(self.idle) < self.maxIdle:
+                self.idle.append(recognizer)
+
+    def getStats(self):
+        with self.lock:
+            return {"created": self.created, "reused": self.reused, "idle": len(self.idle)}
+
+
+class SpeechSession:
+    """A single connection's recognizer, reset after every utterance"""
+
+    def __init__(self, pool, gate=None):
+        self.pool = pool
+        self.recognizer = None
+        # Drops silent streamed chunks before they are decoded
+        self.gate = gate
+        self.partial = ''
+        # A session is only ever driven by one utterance at a time
+        self.lock = threading.Lock()
+
+    def getRecognizer(self):
+        """The session's recognizer, taken from the pool on first use"""
+        if self.recognizer is None:
+            self.recognizer = self.pool.acquire()
+        return self.recognizer
+
+    def close(self):
+        if self.recognizer is not None:
+            self.pool.release(self.recognizer)
+            self.recognizer = None
@@ -0,0 +1,303 @@
+import itertools
+import json
+import multiprocessing
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+
+def _workerMain(modelPath, sampleRate, connection, memoryName, slotBytes):
+    """Worker process: load the Vosk model once, then decode utterances until told to stop"""
+    memory = shared_memory.SharedMemory(name=memoryName)
+    try:
+        try:
+            from vosk import Model, KaldiRecognizer
+            recognizer = KaldiRecognizer(Model(modelPath), sampleRate)
+            recognizer.SetWords(True)
+        except Exception as e:
+            connection.send(('failed', str(e)))
+            return
+        connection.send(('ready', None))
+        while True:
+            request = connection.recv()
+            if request is None:
+                return
+            requestId, slot, length, inline = request
+            if inline is None:
+                start = slot * slotBytes
+                audio = bytes(memory.buf[start:start + length])
+            else:
+                audio = inline
+            try:
+                texts = []
+                if recognizer.AcceptWaveform(audio):
+                    texts.append(json.loads(recognizer.Result()).get('text', ''))
+                texts.append(json.loads(recognizer.FinalResult()).get('text', ''))
+                result = ' '.join(text for text in texts if text).strip()
+            except Exception as e:
+                result = f"ERROR: Speech processing failed - {str(e)}"
+            finally:
+                recognizer.Reset()
+            connection.send(('result', requestId, result))
+    finally:
+        memory.close()
+
+
+class SpeechWorker:
+    """Parent side of one worker process, its pipe and its shared audio slots"""
+
+    def __init__(self, index, memory, slots):
+        self.index = index
+        self.memory = memory
+        self.freeSlots = list(range(slots))
+        # requestId -> (future, slot, length)
+        self.pending = {}
+        self.pendingBytes = 0
+        # Bumped whenever pending requests are failed and the slots reset
+        self.generation = 0
+        self.process = None
+        self.connection = None
+        # Slot writes and sends happen outside the pool's lock, a pipe only takes one writer at a time
+        self.sendLock = threading.Lock()
+        self.ready = False
+        self.failed = None
+        self.decoded = 0
+        self.restarts = 0
+
+
+class SpeechWorkerPool:
+    """
+    Decodes whole utterances in separate processes, so Kaldi doesn't
+    compete with the LLM and the websocket loop for this process's GIL.
+    Every worker loads the Vosk model once and keeps one recognizer.
+
+    Audio is handed over through a shared memory block per worker, split
+    into slotsPerWorker slots of slotSeconds each; only the request id,
+    slot and length go through the pipe. Longer utterances are sent
+    inline. Each utterance goes to the ready worker with the fewest
+    pending requests, and a worker that dies is restarted with its
+    pending requests failed. A worker that takes longer than timeoutSeconds
+    plus timeoutPerAudioSecond for every second of audio queued on it is
+    assumed hung and restarted the same way.
+    """
+
+    def __init__(self, modelPath, workers=2, sampleRate=16000, slotsPerWorker=4, slotSeconds=30,
+                 timeoutSeconds=10, timeoutPerAudioSecond=1.0):
+        self.modelPath = modelPath
+        self.workerCount = workers
+        self.sampleRate = sampleRate
+        self.slotsPerWorker = slotsPerWorker
+        self.slotBytes = sampleRate * 2 * slotSeconds
+        self.timeoutSeconds = timeoutSeconds
+        self.timeoutPerAudioSecond = timeoutPerAudioSecond
+        # Forking a process that already runs threads is unsafe, spawn behaves the same everywhere
+        self.context = multiprocessing.get_context('spawn')
+
+        self.workers = []
+        self.requestIds = itertools.count(1)
+        self.available = threading.Condition()
+        self.collector = None
+        self.running = False
+        self.sharedHandoffs = 0
+        self.inlineHandoffs = 0
+        self.timeouts = 0
+
+    def start(self):
+        """Start the workers and wait until each loaded the model, returns False if any failed"""
+        self.running = True
+        for index in range(self.workerCount):
+            memory = shared_memory.SharedMemory(create=True, size=self.slotBytes * self.slotsPerWorker)
+            worker = SpeechWorker(index, memory, self.slotsPerWorker)
+            self._spawn(worker)
+            self.workers.append(worker)
+        self.collector = threading.Thread(target=self._collect, name='stt-collector', daemon=True)
+        self.collector.start()
+
+        with self.available:
+            self.available.wait_for(lambda: all(worker.ready or worker.failed for worker in self.workers))
+        failures = [worker.failed for worker in self.workers if worker.failed]
+        if failures:
+            print(f"Speech worker failed to load the model: {failures[0]}")
+            self.shutdown()
+            return False
+        return True
+
+    def decode(self, pcm):
+        """Decode one utterance of 16-bit mono PCM on the least loaded worker and return its text"""
+        future = Future()
+        inline = len(pcm) > self.slotBytes
+        with self.available:
+            while True:
+                if not any(worker.ready for worker in self.workers):
+                    raise RuntimeError("No speech worker is running")
+                worker = self._leastLoaded(inline)
+                if worker is not None:
+                    break
+                # Every slot is taken, wait for a result to free one
+                self.available.wait()
+            requestId = next(self.requestIds)
+            slot = None
+            if inline:
+                self.inlineHandoffs += 1
+            else:
+                slot = worker.freeSlots.pop()
+                self.sharedHandoffs += 1
+            worker.pending[requestId] = (future, slot, len(pcm))
+            worker.pendingBytes += len(pcm)
+            # Everything queued on the worker decodes before this utterance
+            timeout = self.timeoutSeconds + self.timeoutPerAudioSecond * worker.pendingBytes / (2 * self.sampleRate)
+            generation = worker.generation
+            connection = worker.connection
+
+        # The slot is reserved, so copying the audio and pickling the request don't hold up other callers
+        try:
+            with worker.sendLock:
+                # A restart in between failed the request and may have given the slot to another one
+                if worker.generation == generation:
+                    if slot is not None:
+                        start = slot * self.slotBytes
+                        worker.memory.buf[start:start + len(pcm)] = pcm
+                    connection.send((requestId, slot, len(pcm), pcm if inline else None))
+        except Exception as e:
+            with self.available:
+                if worker.generation == generation and requestId in worker.pending:
+                    self._complete(worker, requestId)
+                    future.set_exception(RuntimeError(f"Could not hand the utterance to a speech worker: {e}"))
+                    self.available.notify_all()
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            with self.available:
+                if worker.generation == generation and requestId in worker.pending:
+                    # Stuck rather than dead, killing it lets the collector restart it and fail its requests
+                    self.timeouts += 1
+                    print(f"Speech worker {worker.index} timed out after {timeout:.1f}s, restarting it")
+                    worker.process.kill()
+            raise RuntimeError(f"Speech worker did not answer within {timeout:.1f}s")
+
+    def _leastLoaded(self, inline):
+        candidates = [worker for worker in self.workers if worker.ready and (inline or worker.freeSlots)]
+        return min(candidates, key=lambda worker: len(worker.pending), default=None)
+
+    def _spawn(self, worker):
+        parentConnection, childConnection = self.context.Pipe()
+        worker.connection = parentConnection
+        worker.ready = False
+        worker.process = self.context.Process(
+            target=_workerMain,
+            args=(self.modelPath, self.sampleRate, childConnection, worker.memory.name, self.slotBytes),
+            name=f'stt-worker-{worker.index}',
+            daemon=True
+        )
+        worker.process.start()
+        childConnection.close()
+
+    def _collect(self):
+        """Resolve results as workers send them and restart workers that exit"""
+        while self.running:
+            sources = {}
+            for worker in self.workers:
+                if worker.failed:
+                    continue
+                sources[worker.connection] = worker
+                sources[worker.process.sentinel] = worker
+            for source in wait(list(sources), timeout=0.5):
+                worker = sources[source]
+                if source is worker.connection:
+                    try:
+                        message = worker.connection.recv()
+                    except (EOFError, OSError):
+                        self._restart(worker)
+                        continue
+                    self._handle(worker, message)
+                elif source == worker.process.sentinel and not worker.process.is_alive():
+                    self._restart(worker)
+
+    def _handle(self, worker, message):
+        with self.available:
+            if message[0] == 'ready':
+                worker.ready = True
+            elif message[0] == 'failed':
+                worker.failed = message[1]
+            else:
+                _, requestId, text = message
+                if requestId not in worker.pending:
+                    # Its sender gave up on it
+                    return
+                future = self._complete(worker, requestId)
+                worker.decoded += 1
+                future.set_result(text)
+            self.available.notify_all()
+
+    def _restart(self, worker):
+        with self.available:
+            if not self.running or worker.failed:
+                return
+            wasReady = worker.ready
+            self._failPending(worker, "Speech worker exited")
+            worker.connection.close()
+            worker.process.join(timeout=1)
+            if not wasReady:
+                # Died while loading the model, restarting would only fail the same way
+                worker.failed = f"exited with code {worker.process.exitcode} while loading the model"
+                self.available.notify_all()
+                return
+            worker.restarts += 1
+            print(f"Speech worker {worker.index} exited, restarting it")
+            self._spawn(worker)
+            self.available.notify_all()
+
+    def _complete(self, worker, requestId):
+        """Forget a request and free its slot, returns its future"""
+        future, slot, length = worker.pending.pop(requestId)
+        worker.pendingBytes -= length
+        if slot is not None:
+            worker.freeSlots.append(slot)
+        return future
+
+    def _failPending(self, worker, reason):
+        for future, _, _ in worker.pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+        worker.pending.clear()
+        worker.pendingBytes = 0
+        worker.freeSlots = list(range(self.slotsPerWorker))
+        worker.generation += 1
+        worker.ready = False
+
+    def getStats(self):
+        with self.available:
+            return {
+                "workers": [
+                    {"pending": len(worker.pending), "decoded": worker.decoded,
+                     "restarts": worker.restarts, "ready": worker.ready}
+                    for worker in self.workers
+                ],
+                "sharedMemoryHandoffs": self.sharedHandoffs,
+                "inlineHandoffs": self.inlineHandoffs,
+                "timeouts": self.timeouts
+            }
+
+    def shutdown(self):
+        """Stop every worker and release the shared memory"""
+        with self.available:
+            self.running = False
+            for worker in self.workers:
+                self._failPending(worker, "Speech workers shut down")
+                try:
+                    with worker.sendLock:
+                        worker.connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            self.available.notify_all()
+        if self.collector is not None and self.collector is not threading.current_thread():
+            self.collector.join()
+        for worker in self.workers:
+            worker.process.join(timeout=2)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.connection.close()
+            worker.memory.close()
+            worker.memory.unlink()
+        self.workers = []
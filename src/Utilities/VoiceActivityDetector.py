@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing voice activity detection over 16-bit mono PCM.
+    Every frame of a buffer is scored at once with NumPy, so trimming several
+    seconds of audio costs around a millisecond.
+    """
+
+    def __init__(self, sampleRate=16000, frameMs=20, marginDb=12.0, floorDb=-55.0,
+                 zcrThreshold=0.25, paddingMs=200):
+        self.sampleRate = sampleRate
+        self.frameSize = sampleRate * frameMs // 1000
+        self.frameMs = frameMs
+        # A frame is speech if it is marginDb above the noise floor, never quieter than floorDb
+        self.marginDb = marginDb
+        self.floorDb = floorDb
+        # Quieter frames still count if they are noisy enough to be fricatives ("s", "f")
+        self.zcrThreshold = zcrThreshold
+        self.paddingFrames = max(1, paddingMs // frameMs)
+
+        self.bytesIn = 0
+        self.bytesKept = 0
+
+    def frameFeatures(self, pcm):
+        """Return per-frame energy in dBFS and zero-crossing rate"""
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        frameCount = len(samples) // self.frameSize
+        if frameCount == 0:
+            return np.empty(0), np.empty(0)
+        frames = samples[:frameCount * self.frameSize].reshape(frameCount, self.frameSize).astype(np.float32) / 32768.0
+
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        energyDb = 20.0 * np.log10(rms + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frameSize - 1)
+        return energyDb, zcr
+
+    def speechMask(self, pcm, noiseFloorDb=None):
+        """Classify every frame of pcm as speech or silence"""
+        energyDb, zcr = self.frameFeatures(pcm)
+        if len(energyDb) == 0:
+            return np.zeros(0, dtype=bool)
+        if noiseFloorDb is None:
+            noiseFloorDb = np.percentile(energyDb, 10)
+        threshold = max(noiseFloorDb + self.marginDb, self.floorDb)
+        loud = energyDb > threshold
+        fricative = (energyDb > threshold - self.marginDb / 2) & (zcr > self.zcrThreshold)
+        return loud | fricative
+
+    def trim(self, pcm):
+        """Cut leading and trailing silence, keeping paddingMs around the speech"""
+        self.bytesIn += len(pcm)
+        mask = self.speechMask(pcm)
+        speechFrames = np.flatnonzero(mask)
+        if len(speechFrames) == 0:
+            return b''
+
+        first = max(0, speechFrames[0] - self.paddingFrames)
+        last = min(len(mask), speechFrames[-1] + 1 + self.paddingFrames)
+        frameBytes = self.frameSize * 2
+        end = len(pcm) if last == len(mask) else last * frameBytes
+        trimmed = pcm[first * frameBytes:end]
+        self.bytesKept += len(trimmed)
+        return trimmed
+
+    def createGate(self, hangoverMs=600, preRollMs=200):
+        """Create a SpeechGate that drops silent chunks from a live stream"""
+        return SpeechGate(self, hangoverMs, preRollMs)
+
+    def getStats(self):
+        """Get how much audio trimming removed before decoding"""
+        reduction = 1.0 - self.bytesKept / self.bytesIn if self.bytesIn else 0.0
+        return {
+            "secondsIn": self.bytesIn / 2 / self.sampleRate,
+            "secondsDecoded": self.bytesKept / 2 / self.sampleRate,
+            "reduction": reduction
+        }
+
+
+class SpeechGate:
+    """
+    Streaming counterpart of VoiceActivityDetector.trim. Chunks are only let
+    through while speech is active, plus a short pre-roll before onset and a
+    hangover afterwards. The hangover must stay longer than the recognizer's
+    endpoint silence so Vosk can still detect end-of-utterance.
+    """
+
+    def __init__(self, vad, hangoverMs, preRollMs):
+        self.vad = vad
+        self.hangoverMs = hangoverMs
+        self.preRollMs = preRollMs
+        self.noiseFloorDb = None
+        self.preRoll = []
+        self.preRollDuration = 0.0
+        self.silenceMs = None
+        self.bytesIn = 0
+        self.bytesPassed = 0
+
+    def process(self, chunk):
+        """Return the list of chunks that should be sent or decoded for this input chunk"""
+        self.bytesIn += len(chunk)
+        chunkMs = len(chunk) / 2 / self.vad.sampleRate * 1000
+        energyDb, _ = self.vad.frameFeatures(chunk)
+        if len(energyDb) == 0:
+            return []
+
+        # Track the noise floor slowly upwards and quickly downwards
+        quietest = float(np.min(energyDb))
+        if self.noiseFloorDb is None or quietest < self.noiseFloorDb:
+            self.noiseFloorDb = quietest
+        else:
+            self.noiseFloorDb += 0.02 * (quietest - self.noiseFloorDb)
+
+        if self.vad.speechMask(chunk, self.noiseFloorDb).any():
+            released = self.preRoll + [chunk]
+            self.preRoll = []
+            self.preRollDuration = 0.0
+            self.silenceMs = 0.0
+        elif self.silenceMs is not None and self.silenceMs < self.hangoverMs:
+            self.silenceMs += chunkMs
+            released = [chunk]
+        else:
+            self.silenceMs = None
+            self.preRoll.append(chunk)
+            self.preRollDuration += chunkMs
+            while self.preRoll and self.preRollDuration > self.preRollMs:
+                dropped = self.preRoll.pop(0)
+                self.preRollDuration -= len(dropped) / 2 / self.vad.sampleRate * 1000
+            released = []
+
+        self.bytesPassed += sum(len(c) for c in released)
+        return released
@@ -3,6 +3,7 @@ import ctypes
 import pycaw
 import time
 import os
+import shlex
 import subprocess
 
 class Executor:    
@@ -33,7 +34,11 @@ class Executor:
         print(application)
         if not path:
             return "ERROR: Application Path not Listed"
-        os.startfile(path)
+        if hasattr(os, 'startfile'):
+            os.startfile(path)
+        else:
+            # Outside Windows the path is a command line, such as a .desktop entry's Exec
+            subprocess.Popen(shlex.split(path), start_new_session=True)
         return "SUCCESS: Opened " + application
     
     def lockScreen(self):
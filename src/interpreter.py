@@ -1,21 +1,136 @@
 import os
 import json
-from vosk import Model, KaldiRecognizer
+import threading
+from vosk import Model
+from Utilities.RecognizerPool import RecognizerPool, SpeechSession
+from Utilities.SpeechWorkerPool import SpeechWorkerPool
+from Utilities.VoiceActivityDetector import VoiceActivityDetector
 class Interpreter:
-    def __init__(self):
-        voskModel = os.path.join("../models/vosk-model-small-en-us-0.15")
-        self.vosk = Model(voskModel)
-        self.recognizer = KaldiRecognizer(self.vosk, 16000)
-        self.recognizer.SetWords(True)
+    def __init__(self, loadModel=True, sttWorkers=0):
+        # One Model is shared by every connection, each gets its own recognizer from the pool
+        self.vosk = None
+        self.recognizerPool = RecognizerPool(None, 16000)
+        # With sttWorkers, whole utterances decode in worker processes; streams stay in process
+        self.sttWorkers = sttWorkers
+        self.workerPool = None
+        # Leading and trailing silence is trimmed before it ever reaches Kaldi
+        self.vad = VoiceActivityDetector(16000)
+        # Set once loading the Vosk model finished, whether or not it succeeded
+        self.ready = threading.Event()
+        if loadModel:
+            self.loadModel()
 
-    def parseSpeech(self, speechFromClient):
+    def loadModel(self):
+        """Load the Vosk model, speech arriving before this finishes waits for it"""
         try:
-            if self.recognizer.AcceptWaveform(speechFromClient):
-                result = json.loads(self.recognizer.Result())
-                return result.get('text', '').strip()
-            else:
-                partial_result = json.loads(self.recognizer.PartialResult())
-                return partial_result.get('partial', '').strip()
-                
+            voskModel = os.path.join("../models/vosk-model-small-en-us-0.15")
+            self.vosk = Model(voskModel)
+            self.recognizerPool.model = self.vosk
+            if self.sttWorkers:
+                workerPool = SpeechWorkerPool(os.path.abspath(voskModel), self.sttWorkers, 16000)
+                if workerPool.start():
+                    self.workerPool = workerPool
+                else:
+                    print("Speech workers failed to start, decoding in process")
+        except Exception as e:
+            print(f"Failed to load Vosk model: {e}")
+        finally:
+            self.ready.set()
+        return self.vosk is not None
+
+    def isModelLoaded(self):
+        """Check if the Vosk model is ready without waiting for it"""
+        return self.vosk is not None
+
+    def openSession(self):
+        """Create a per-connection speech session with its own recognizer"""
+        return SpeechSession(self.recognizerPool, self.vad.createGate())
+
+    def closeSession(self, session):
+        """Return a session's recognizer to the pool"""
+        session.close()
+
+    def parseSpeech(self, speechFromClient, session=None):
+        speechFromClient = self.vad.trim(speechFromClient)
+        if not speechFromClient:
+            return ''
+        self.ready.wait()
+        if self.vosk is None:
+            return "ERROR: Speech model is not available"
+        if self.workerPool is not None:
+            try:
+                return self.workerPool.decode(speechFromClient)
+            except RuntimeError as e:
+                print(f"Speech worker failed, decoding in process: {e}")
+        if session is None:
+            recognizer = self.recognizerPool.acquire()
+            try:
+                return self._decodeUtterance(recognizer, speechFromClient)
+            finally:
+                self.recognizerPool.release(recognizer)
+        with session.lock:
+            return self._decodeUtterance(session.getRecognizer(), speechFromClient)
+
+    def acceptChunk(self, session, chunk):
+        """
+        Feed one streamed audio chunk into the session's recognizer.
+        Returns (finalTexts, partialText): the text of every end-of-utterance
+        the recognizer detected in this chunk, in order, and the partial
+        transcript of the audio after the last one.
+        """
+        with session.lock:
+            speech = session.gate.process(chunk)
+            if not speech:
+                return [], session.partial
+            self.ready.wait()
+            if self.vosk is None:
+                return [], ''
+            recognizer = session.getRecognizer()
+            # The gate can release several buffered pieces at once, each may finish an utterance
+            finalTexts = []
+            for data in speech:
+                if recognizer.AcceptWaveform(data):
+                    finalTexts.append(json.loads(recognizer.Result()).get('text', '').strip())
+                    recognizer.Reset()
+            session.partial = json.loads(recognizer.PartialResult()).get('partial', '').strip()
+            return finalTexts, session.partial
+
+    def finishStream(self, session):
+        """Flush whatever audio is still buffered in the session and reset it"""
+        with session.lock:
+            recognizer = session.recognizer
+            if recognizer is None:
+                session.partial = ''
+                return ''
+            try:
+                return json.loads(recognizer.FinalResult()).get('text', '').strip()
+            finally:
+                recognizer.Reset()
+                session.partial = ''
+
+    def getStats(self):
+        """Get recognizer reuse and silence trimming statistics"""
+        stats = {"recognizers": self.recognizerPool.getStats(), "vad": self.vad.getStats()}
+        if self.workerPool is not None:
+            stats["workers"] = self.workerPool.getStats()
+        return stats
+
+    def shutdown(self):
+        """Stop the speech worker processes"""
+        if self.workerPool is not None:
+            self.workerPool.shutdown()
+            self.workerPool = None
+
+    def _decodeUtterance(self, recognizer, speechFromClient):
+        """Decode a complete utterance and reset the recognizer for the next one"""
+        try:
+            texts = []
+            if recognizer.AcceptWaveform(speechFromClient):
+                texts.append(json.loads(recognizer.Result()).get('text', ''))
+            texts.append(json.loads(recognizer.FinalResult()).get('text', ''))
+            return ' '.join(text for text in texts if text).strip()
+
         except Exception as e:
             return f"ERROR: Speech processing failed - {str(e)}"
+        finally:
+            recognizer.Reset()
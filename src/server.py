@@ -2,74 +2,226 @@ import asyncio
 import websockets
 import traceback
 import threading
-import sys
+import time
+import psutil
 
-from Executor import Executor
-from Interpreter import Interpreter
 from Autocorrect import Autocorrect
+from CommandPipeline import CommandPipeline
+from AudioStream import AudioStream
+from PipelinedRequests import PipelinedRequests
+from Protocol import (STATS, AUDIO_FORMAT, COMMAND, END_OF_UTTERANCE, STREAM_START, STREAM_END, ERROR, BUSY_RESPONSE,
+                      encodeMessage, parseControlMessage, parseEnvelope)
+from Utilities.AdmissionController import AdmissionController
+from Utilities.AudioDecoder import AudioDecoder, PCM16
 from Utilities.FileLogger import FileLogger
 from Utilities.DownloadModel import ModelDownloader
-from UserInterface import UserInterface
+from Utilities.LoopMonitor import LoopMonitor
 
 
 connected_clients = set()
 
-def create_handler(execute, interpret, autocorrect, file):
+# Seconds from process start until each startup phase finished
+startup_metrics = {}
+
+def record_startup_phase(phase, file=None):
+    """Record how long after process start a startup phase completed"""
+    elapsed = time.time() - psutil.Process().create_time()
+    startup_metrics[phase] = elapsed
+    print(f"Startup: {phase} after {elapsed:.2f}s")
+    if file is not None:
+        file.writeToFile(f"Startup: {phase} after {elapsed:.2f}s")
+
+# Concurrent LLM corrections arriving within this window share one batched generate
+LLM_BATCH_WINDOW_MS = 10
+LLM_MAX_BATCH_SIZE = 8
+
+# "llm" corrects with the language model, "classifier" tries the TF-IDF intent classifier first
+CORRECTION_BACKEND = "llm"
+
+# None runs the LLM in float32 on CPU, "int8" uses dynamic int8 quantized linear layers
+LLM_QUANTIZATION = None
+
+# Processes decoding whole utterances, each loads its own copy of the Vosk model.
+# 0 decodes in the server process
+STT_WORKERS = 2
+
+# Seconds between background rescans for installed applications
+APP_DISCOVERY_INTERVAL = 600
+
+# Requests admitted server wide and per connection before new ones are answered busy
+ADMISSION_MAX_QUEUED = 32
+ADMISSION_MAX_IN_FLIGHT_PER_CLIENT = 4
+
+# Audio buffered from AUDIO_CHUNK envelopes before END_OF_UTTERANCE, per utterance and per connection
+PIPELINED_MAX_UTTERANCE_BYTES = 4 * 1024 * 1024
+PIPELINED_MAX_BUFFERED_BYTES = 8 * 1024 * 1024
+PIPELINED_MAX_PENDING_UTTERANCES = 8
+
+def collect_stats(pipeline, interpret, autocorrect, loopMonitor=None, admission=None):
+    """Everything a stats message reports: per-stage latency percentiles and server counters"""
+    stats = {
+        "latency": pipeline.latencyTracker.getStats(),
+        "stages": pipeline.getStats(),
+        "autocorrect": autocorrect.getStats(),
+        "speech": interpret.getStats(),
+        "startup": startup_metrics
+    }
+    if loopMonitor is not None:
+        stats["eventLoop"] = loopMonitor.getStats()
+    if admission is not None:
+        stats["admission"] = admission.getStats()
+    return stats
+
+async def process_raw(websocket, pipeline, session, admission, message, decoder=None):
+    """Answer a raw text or audio message, or BUSY_RESPONSE if it isn't admitted"""
+    if not admission.tryAdmit(websocket):
+        await websocket.send(BUSY_RESPONSE)
+        return
+    try:
+        # STT, autocorrect and execution run on worker pools so other clients keep being served
+        result = await pipeline.process(message, session, decoder=decoder)
+    finally:
+        admission.release(websocket)
+    await websocket.send(result)
+
+def negotiate_format(decoder, control):
+    """Apply an audio_format request and answer with the format in effect, or an error"""
+    reply = {"replyTo": control['id']} if 'id' in control else {}
+    try:
+        decoder.configure(control.get('sampleRate', 16000), control.get('channels', 1), control.get('encoding', PCM16))
+    except ValueError as e:
+        return encodeMessage(ERROR, error=str(e), **reply)
+    return encodeMessage(AUDIO_FORMAT, **decoder.describe(), **reply)
+
+def create_handler(execute, interpret, autocorrect, file, pipeline=None, loopMonitor=None, admission=None):
     """Factory function to create a WebSocket handler with dependencies"""
+    if pipeline is None:
+        pipeline = CommandPipeline(execute, interpret, autocorrect, file)
+    if admission is None:
+        admission = AdmissionController(ADMISSION_MAX_QUEUED, ADMISSION_MAX_IN_FLIGHT_PER_CLIENT)
+
     async def handle_client(websocket):
         connected_clients.add(websocket)
+        # Each connection decodes with its own recognizer so concurrent clients don't share decoder state
+        session = interpret.openSession()
+        # Converts whatever audio format the client negotiated to 16 kHz mono PCM
+        decoder = AudioDecoder()
+        stream = AudioStream(websocket, pipeline, session, file, admission, decoder)
+        # Enveloped requests are answered out of order as they finish
+        requests = PipelinedRequests(websocket, pipeline, file, admission, decoder, PIPELINED_MAX_UTTERANCE_BYTES,
+                                     PIPELINED_MAX_BUFFERED_BYTES, PIPELINED_MAX_PENDING_UTTERANCES)
         try:
             print(websocket)
             async for message in websocket:
+                control = None
                 try:
-                    if isinstance(message, bytes):
-                        file.writeToFile("Audio Message received from CLIENT: 'PARSING'")
-                        message = interpret.parseSpeech(message)
-                    file.writeToFile("Message Received from CLIENT: '" + message + "'")
-                    
-                    # Apply autocorrect to the message
-                    correctedMessage = autocorrect.correctCommand(message)
-                    print(correctedMessage)
-                    file.writeToFile("Autocorrected Message: '" + correctedMessage['command'] + "'")
-                    
-                    result = execute.executeCommand(correctedMessage)
-                    file.writeToFile("Response from EXECUTOR: '" + result + "'")
-                    await websocket.send(result)
+                    control = parseControlMessage(message)
+                    envelope = parseEnvelope(message)
+                    if control is not None and control['type'] == STATS:
+                        stats = collect_stats(pipeline, interpret, autocorrect, loopMonitor, admission)
+                        if 'id' in control:
+                            stats['replyTo'] = control['id']
+                        await websocket.send(encodeMessage(STATS, **stats))
+                    elif control is not None and control['type'] == AUDIO_FORMAT:
+                        await websocket.send(negotiate_format(decoder, control))
+                    elif control is not None and control['type'] in (COMMAND, END_OF_UTTERANCE):
+                        await requests.handleControl(control)
+                    elif control is not None and control['type'] in (STREAM_START, STREAM_END):
+                        await stream.handleControl(control)
+                    elif control is not None:
+                        # Answered so a client waiting on this id doesn't wait forever
+                        reply = {"replyTo": control['id']} if 'id' in control else {}
+                        await websocket.send(encodeMessage(
+                            ERROR, error=f"Unknown message type '{control['type']}'", **reply))
+                    elif envelope is not None:
+                        await requests.handleEnvelope(*envelope)
+                    elif isinstance(message, bytes) and stream.active:
+                        # Streamed chunks are decoded incrementally as they arrive
+                        await stream.feed(message)
+                    else:
+                        # Raw audio is converted on the STT stage, not on the event loop
+                        await process_raw(websocket, pipeline, session, admission, message, decoder)
+                except websockets.exceptions.ConnectionClosed:
+                    raise
                 except Exception as e:
+                    # A failing request is answered with an error, the connection and server keep running
+                    admission.recordFailure()
                     file.writeToFile(traceback.format_exc())
                     traceback.print_exc()
-                    sys.exit(-1)
+                    if control is not None:
+                        reply = {"replyTo": control['id']} if 'id' in control else {}
+                        await websocket.send(encodeMessage(ERROR, error=str(e), **reply))
+                    else:
+                        await websocket.send("SERVER ERROR: " + str(e))
         except websockets.exceptions.ConnectionClosed:
             pass
         except Exception as e:
             print(f"Connection error: {e}")
         finally:
             connected_clients.remove(websocket)
+            requests.close()
+            interpret.closeSession(session)
     
     return handle_client
 
 async def main(execute, interpret, autocorrect, file):
     """Run the WebSocket server with provided dependencies"""
-    handle_client = create_handler(execute, interpret, autocorrect, file)
+    # Enough STT threads to keep every speech worker process busy
+    pipeline = CommandPipeline(execute, interpret, autocorrect, file, sttWorkers=max(2, 2 * STT_WORKERS))
+
+    # Track event loop lag so long-running stages can be proven not to stall the loop
+    loopMonitor = LoopMonitor()
+    loopMonitor.start()
+    admission = AdmissionController(ADMISSION_MAX_QUEUED, ADMISSION_MAX_IN_FLIGHT_PER_CLIENT)
+    handle_client = create_handler(execute, interpret, autocorrect, file, pipeline, loopMonitor, admission)
+
     server = await websockets.serve(handle_client, 'localhost', 12345)
     print("WebSocket server started on localhost:12345")
-    await server.wait_closed()
+    record_startup_phase("serverReady", file)
+    try:
+        await server.wait_closed()
+    finally:
+        loopMonitor.stop()
+        pipeline.shutdown()
 
 def start_server(execute, interpret, autocorrect, file):
     """Run the WebSocket server in a background thread"""
     asyncio.run(main(execute, interpret, autocorrect, file))
 
+def load_models(interpret, autocorrect, file):
+    """
+    Download and load the speech and language models while the server is
+    already accepting connections. Audio waits for Vosk, commands use the
+    rule-based fallback until the LLM is published.
+    """
+    modelDownloader = ModelDownloader()
+    # Vosk is small and loads first, so speech works long before the LLM does
+    modelDownloader.downloadVoskModel()
+    # Also releases waiting speech requests if the model is missing
+    interpret.loadModel()
+    record_startup_phase("voskLoaded", file)
+
+    if modelDownloader.downloadLlmModel():
+        # The only full LLM load; the optimizer is shared by autocorrect and its batch scheduler
+        autocorrect.loadModel()
+    record_startup_phase("llmLoaded", file)
+
 if __name__ == "__main__":
+    # Platform specific components are only imported when running the server,
+    # so the handler and pipeline can be imported and driven on their own
+    from executor import Executor
+    from interpreter import Interpreter
+    from UserInterface import UserInterface
+
     # Initialize all application components
     file = FileLogger()
     file.setupLogging()
     
-    modelDownloader = ModelDownloader()
-    voskSuccess, llmSuccess = modelDownloader.setupAllModels()
-    
+    # Models are loaded after the server is up, see load_models
     execute = Executor()
-    interpret = Interpreter()
-    autocorrect = Autocorrect()
+    interpret = Interpreter(loadModel=False, sttWorkers=STT_WORKERS)
+    autocorrect = Autocorrect(quantization=LLM_QUANTIZATION, loadModel=False, backend=CORRECTION_BACKEND)
+    autocorrect.enableBatching(LLM_BATCH_WINDOW_MS, LLM_MAX_BATCH_SIZE)
     
     # Start WebSocket server in background thread
     server_thread = threading.Thread(
@@ -78,6 +230,17 @@ if __name__ == "__main__":
         daemon=True
     )
     server_thread.start()
+
+    model_thread = threading.Thread(
+        target=load_models,
+        args=(interpret, autocorrect, file),
+        name='model-loader',
+        daemon=True
+    )
+    model_thread.start()
+
+    # Fingerprints application sources and merges what changed, never blocks startup
+    autocorrect.appRegistry.startDiscovery(APP_DISCOVERY_INTERVAL)
     
     # Create and start UI in main thread
     ui = UserInterface(
@@ -87,4 +250,9 @@ if __name__ == "__main__":
         file_logger=file,
         app_registry=autocorrect.appRegistry
     )
-    ui.run()
\ No newline at end of file
+    ui.run()
+
+    # Keep corrections learned during this session for the next start
+    autocorrect.correctionCache.save()
+    interpret.shutdown()
+    file.close()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, os.path.abspath(SOURCE_DIRECTORY))
+
+
+@pytest.fixture
+def sourceDirectory(monkeypatch):
+    """Run from src, where the server runs and relative resource paths resolve"""
+    monkeypatch.chdir(SOURCE_DIRECTORY)
+    return SOURCE_DIRECTORY
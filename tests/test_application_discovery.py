@@ -0,0 +1,32 @@
+import os
+
+from Utilities.ApplicationDiscovery import LinuxDiscovery, parseDesktopEntry
+
+
+def test_terminal_entries_are_skipped():
+    entry = ["[Desktop Entry]", "Type=Application", "Name=htop", "Exec=htop", "Terminal=true"]
+    assert parseDesktopEntry(entry) is None
+    assert parseDesktopEntry(entry[:-1]) == ["htop", "htop"]
+
+
+def test_path_is_not_scanned_by_default(tmp_path, monkeypatch):
+    binaries = tmp_path / "bin"
+    binaries.mkdir()
+    monkeypatch.setenv("PATH", str(binaries))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("XDG_DATA_DIRS", str(tmp_path / "shared"))
+    assert LinuxDiscovery().listSources() == []
+    assert LinuxDiscovery(scanPath=True).listSources() == [str(binaries)]
+
+
+def test_symlinked_desktop_directories_are_listed_once(tmp_path, monkeypatch):
+    applications = tmp_path / "shared" / "applications"
+    applications.mkdir(parents=True)
+    (applications / "firefox.desktop").write_text("[Desktop Entry]\nType=Application\nName=Firefox\nExec=firefox %u\n")
+    os.symlink(tmp_path / "shared", tmp_path / "linked")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("XDG_DATA_DIRS", f"{tmp_path / 'shared'}:{tmp_path / 'linked'}")
+    discovery = LinuxDiscovery()
+    sources = discovery.listSources()
+    assert len(sources) == 1
+    assert discovery.scan(sources[0]) == [["Firefox", "firefox"]]
@@ -0,0 +1,20 @@
+import json
+
+from Autocorrect import Autocorrect
+from Utilities.ApplicationRegistry import ApplicationRegistry
+
+
+def test_every_application_is_a_valid_output(sourceDirectory, tmp_path):
+    apps = [["Notepad", "C:\\Windows\\notepad.exe"], ["Firefox", "C:\\Firefox\\firefox.exe"],
+            ["Steam", "C:\\Steam\\steam.exe"]]
+    cacheFile = tmp_path / "applications.json"
+    cacheFile.write_text(json.dumps(apps), encoding="utf-8")
+    registry = ApplicationRegistry(str(cacheFile))
+    autocorrect = Autocorrect(loadModel=False, appRegistry=registry)
+
+    outputs = autocorrect._validOutputs()
+    for name, _ in registry.apps:
+        assert f"open {name}" in outputs
+
+    registry.addApplication("Discord", "C:\\Discord\\discord.exe")
+    assert "open Discord" in autocorrect._validOutputs()
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import server
+from Protocol import ERROR, encodeMessage
+
+
+class FakeWebSocket:
+    """Yields the given messages as if a client sent them and records every answer"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.sent = []
+
+    def __aiter__(self):
+        return self._receive()
+
+    async def _receive(self):
+        for message in self.messages:
+            yield message
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class FakeInterpreter:
+    def openSession(self):
+        return None
+
+    def closeSession(self, session):
+        pass
+
+
+def test_unknown_message_type_is_answered_with_error():
+    websocket = FakeWebSocket([encodeMessage('no_such_type', id=7)])
+    handler = server.create_handler(None, FakeInterpreter(), None, None, pipeline=object())
+    asyncio.run(handler(websocket))
+
+    reply = json.loads(websocket.sent[0])
+    assert reply['type'] == ERROR
+    assert reply['replyTo'] == 7